@@ -8,7 +8,7 @@ from space_time_pipeline.trader.binance import BinanceTrader
 
 trader = BinanceTrader()
 
-available_balance = trader.available_balance
+available_balance = trader.available_balance()
 print(f"Available Balance: {available_balance}")
 
 trader.client.futures_account_balance
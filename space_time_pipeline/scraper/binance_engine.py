@@ -2,12 +2,23 @@
 # Import #
 ##############################################################################
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import asyncio
 import os
-import json
+import threading
+import time
+from typing import Literal
 import requests 
+from requests.adapters import HTTPAdapter
 
+import aiohttp
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import urllib3
 
 from .__base import BaseScraper
 
@@ -19,7 +30,8 @@ class BinanceScraper(BaseScraper):
     
     def __init__(
             self, 
-            key: str = "https://api.binance.com/api/v3/ticker/price?symbol="
+            key: str = "https://api.binance.com/api/v3/ticker/price?symbol=",
+            max_workers: int = 16,
     ) -> None:
         """Initiate the BinanceScraper instance
 
@@ -28,6 +40,9 @@ class BinanceScraper(BaseScraper):
         key : str, optional
             The key for create the request, by default 
             "https://api.binance.com/api/v3/ticker/price?symbol="
+        max_workers : int, optional
+            Default concurrent requests of `detail_scrape_to_pd`,
+            also the connections kept alive, by default 16
         
         Notes
         -----
@@ -39,6 +54,19 @@ class BinanceScraper(BaseScraper):
         # Set key to default
         self.set_key(key)
         
+        # One requests session per thread, `requests.Session` is not 
+        # thread-safe, all mounted with one adapter whose connection 
+        # pool is, so connections are reused across calls
+        self.max_workers = max_workers
+        self.__adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self.__local = threading.local()
+        
+        # Thin keep-alive pool for the plain ticker GET in `scrape`
+        self.__http = urllib3.PoolManager(
+            maxsize=32,
+            block=False,
+            headers={"Accept-Encoding": "gzip"},
+        )
     
     ##########################################################################
     
@@ -54,11 +82,24 @@ class BinanceScraper(BaseScraper):
         
     ##########################################################################
     
+    @property
+    def session(self) -> requests.Session:
+        """Session of the calling thread, created at first access"""
+        if not hasattr(self.__local, "session"):
+            session = requests.Session()
+            session.mount("https://", self.__adapter)
+            session.mount("http://", self.__adapter)
+            self.__local.session = session
+        return self.__local.session
+    
+    ##########################################################################
+    
     def scrape(
             self, 
             assets: list[str],
             result_path: str = "tmp_scrape",
             return_result: list[dict] = False,
+            mode: Literal["json", "jsonl"] = "json",
     ) -> list[dict]:
         """Scrape the data, use API in this case
 
@@ -66,44 +107,85 @@ class BinanceScraper(BaseScraper):
         ----------
         assets : list[str]
             list of asset in Binance symbol
+        result_path : str, optional
+            Directory to export result, by default "tmp_scrape"
+        return_result : bool, optional
+            Return the scraped result if True, by default False
+        mode : Literal["json", "jsonl"], optional
+            `json` writes one file per asset per scrape,
+            `jsonl` appends a line to one file per asset per day, 
+            by default "json"
 
         Returns
         -------
         list[dict]
             List of scraped result
         """
+        if mode not in ("json", "jsonl"):
+            raise ValueError(f"{mode} does not suitable")
+        
         # Initiate scraped_result as empty list
         scraped_result = []
         
-        # Iterate over assets
-        for asset in assets:
-            
-            # Get data
-            url = self.key + asset  
-            data = requests.get(url) 
-            
-            # Get current date
-            timestamp = datetime.utcnow()
-            timestamp_json = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-            timestamp_file_name = timestamp.strftime('%Y%m%d_%H%M%S')
-            
-            # JSONize
-            data = data.json() 
-            
-            # Result
-            result = self.get_default_dict()
-
-            # Append value
-            result["timestamp"] = timestamp_json
-            result["asset"] = data["symbol"]
-            result["price"] = data["price"]
-            
-            # Export
-            # Convert date format
-            file_name = f"{result['asset']}_{timestamp_file_name}.json"
-            self.export_json(result, result_path, file_name)
-            
-            scraped_result.append(result)
+        # Get current date, once for the whole batch
+        # Format both strings from the same UTC struct
+        timestamp = time.gmtime()
+        timestamp_json = time.strftime('%Y-%m-%d %H:%M:%S', timestamp)
+        timestamp_file_name = time.strftime('%Y%m%d_%H%M%S', timestamp)
+        
+        # Build every URL up front, out of the request loop
+        base = self.key
+        urls = [f"{base}{asset}" for asset in assets]
+        
+        # JSONL handles, opened once per asset for the whole scrape
+        jsonl_files = {}
+        if mode == "jsonl":
+            os.makedirs(result_path, exist_ok=True)
+            timestamp_day = timestamp_file_name[:8]
+        
+        try:
+            # Iterate over assets
+            for url in urls:
+                
+                # Get data
+                data = self.__http.request("GET", url)
+                
+                # JSONize
+                data = orjson.loads(data.data)
+                
+                # Result
+                # Build in one literal, skip the default template round trip
+                result = {
+                    "timestamp": timestamp_json,
+                    "asset": data["symbol"],
+                    "price": data["price"],
+                    "source_id": 0,
+                    "engine": 0,
+                }
+                
+                # Export
+                if mode == "jsonl":
+                    asset = result["asset"]
+                    if asset not in jsonl_files:
+                        jsonl_files[asset] = open(
+                            os.path.join(
+                                result_path, 
+                                f"{asset}_{timestamp_day}.jsonl",
+                            ), 
+                            "ab",
+                        )
+                    jsonl_files[asset].write(orjson.dumps(result) + b"\n")
+                else:
+                    # Convert date format
+                    file_name = f"{result['asset']}_{timestamp_file_name}.json"
+                    self.export_json(result, result_path, file_name)
+                
+                scraped_result.append(result)
+        
+        # Flush and close at the end of scrape, not per record
+        finally:
+            for jsonl_file in jsonl_files.values():
+                jsonl_file.close()
         
         # Return value if needed
         if return_result is True:
@@ -119,7 +201,8 @@ class BinanceScraper(BaseScraper):
             assets: list[str],
             params: dict,
             columns: list[str],
-            column_type: dict
+            column_type: dict,
+            max_workers: int = None,
     ) -> pd.DataFrame:
         """Scrape the data, validate types, and return as DataFrame.
 
@@ -133,55 +216,314 @@ class BinanceScraper(BaseScraper):
             Expected column names for the DataFrame.
         column_type : dict
             Expected types for each column.
+        max_workers : int, optional
+            Maximum number of concurrent requests, 
+            by default `self.max_workers`
 
         Returns
         -------
         pd.DataFrame
             A concatenated DataFrame containing data for all assets.
         """
-        all_dataframes = []  # List to store DataFrames for each asset
-        
-        for asset in assets:
+        def fetch(asset: str) -> pd.DataFrame:
             try:
-                # Update params with the current asset symbol
-                params['symbol'] = asset
-
-                # Make the API request
-                response = requests.get(self.key, params=params)
-                response.raise_for_status()  # Ensure no HTTP errors
-                data = response.json()
+                return self.fetch_klines_df(
+                    asset, params, columns, column_type
+                )
+            except Exception as e:
+                print(f"Error processing asset {asset}: {e}")
+        
+        # Requests release the GIL while waiting on the socket
+        # so the network wait of each asset overlaps
+        max_workers = max_workers or self.max_workers
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(assets)))
+        ) as executor:
+            all_dataframes = [
+                df for df in executor.map(fetch, assets) if df is not None
+            ]
 
-                # Convert data to DataFrame
-                df = pd.DataFrame(data, columns=columns)
+        # Combine all DataFrames into one
+        if all_dataframes:
+            final_df = pd.concat(all_dataframes, ignore_index=True)
+            return final_df
+        else:
+            return pd.DataFrame()
+    
+    ##########################################################################
+    
+    def detail_scrape_to_parquet(
+            self, 
+            assets: list[str],
+            params: dict,
+            columns: list[str],
+            column_type: dict,
+            output_path: str,
+            compression: str = "zstd",
+    ) -> str:
+        """Scrape the data, validate types, and stream it to parquet.
+        
+        Each asset is written as its own row group as soon as it is
+        converted, so only one asset is held in memory at a time.
 
-                # Enforce data types
-                for col, dtype in column_type.items():
-                    try:
-                        df[col] = df[col].astype(dtype)
-                    except ValueError as e:
-                        raise ValueError(f"Type conversion failed for column '{col}': {e}")
+        Parameters
+        ----------
+        assets : list[str]
+            List of assets in Binance symbol format.
+        params : dict
+            Parameters for the API request.
+        columns : list[str]
+            Expected column names for the DataFrame.
+        column_type : dict
+            Expected types for each column.
+        output_path : str
+            Path of the parquet file
+        compression : str, optional
+            Parquet compression codec, by default "zstd"
 
-                # Add metadata columns
-                timestamp = datetime.utcnow()
-                df['scraped_time'] = timestamp
-                df['asset'] = asset
+        Returns
+        -------
+        str
+            `output_path`, or None if no asset was scraped
+        """
+        writer = None
+        
+        try:
+            for asset in assets:
+                try:
+                    df = self.fetch_klines_df(
+                        asset, params, columns, column_type
+                    )
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    
+                    # Open the writer with the schema of the first asset
+                    if writer is None:
+                        writer = pq.ParquetWriter(
+                            output_path, 
+                            table.schema, 
+                            compression=compression,
+                        )
+                    
+                    # Skip the asset whose schema can not be cast
+                    writer.write_table(table.cast(writer.schema))
+                except Exception as e:
+                    print(f"Error processing asset {asset}: {e}")
+                    continue
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        if writer is None:
+            return None
+        
+        return output_path
+    
+    ##########################################################################
+    
+    async def detail_scrape_to_pd_async(
+            self, 
+            assets: list[str],
+            params: dict,
+            columns: list[str],
+            column_type: dict
+    ) -> pd.DataFrame:
+        """Concurrent version of `detail_scrape_to_pd`.
+        
+        All kline requests are issued at once, so the wall time is
+        bounded by the slowest response instead of the sum of them.
+        DataFrames are built in a thread pool to keep the event loop
+        free.
 
-                # Append to the list of DataFrames
-                all_dataframes.append(df)
+        Parameters
+        ----------
+        assets : list[str]
+            List of assets in Binance symbol format.
+        params : dict
+            Parameters for the API request.
+        columns : list[str]
+            Expected column names for the DataFrame.
+        column_type : dict
+            Expected types for each column.
 
+        Returns
+        -------
+        pd.DataFrame
+            A concatenated DataFrame containing data for all assets.
+        """
+        loop = asyncio.get_running_loop()
+        
+        async def fetch(
+                session: aiohttp.ClientSession, 
+                executor: ThreadPoolExecutor,
+                asset: str,
+        ) -> pd.DataFrame:
+            try:
+                # Do not mutate the shared params across tasks
+                async with session.get(
+                    self.key, 
+                    params={**params, 'symbol': asset},
+                ) as response:
+                    response.raise_for_status()
+                    data = orjson.loads(await response.read())
+                
+                # Convert data to typed DataFrame off the event loop
+                return await loop.run_in_executor(
+                    executor, 
+                    self.klines_to_df,
+                    asset, 
+                    data, 
+                    columns, 
+                    column_type,
+                )
+            
             except Exception as e:
                 print(f"Error processing asset {asset}: {e}")
-
+        
+        with ThreadPoolExecutor() as executor:
+            async with aiohttp.ClientSession() as session:
+                results = await asyncio.gather(
+                    *[fetch(session, executor, asset) for asset in assets]
+                )
+        
         # Combine all DataFrames into one
+        all_dataframes = [df for df in results if df is not None]
         if all_dataframes:
-            final_df = pd.concat(all_dataframes, ignore_index=True)
-            return final_df
+            return pd.concat(all_dataframes, ignore_index=True)
         else:
             return pd.DataFrame()
+    
     #############
     # Utilities #
     ##########################################################################
     
+    def fetch_klines_df(
+            self,
+            asset: str,
+            params: dict,
+            columns: list[str],
+            column_type: dict,
+    ) -> pd.DataFrame:
+        """Request klines of `asset` and convert it to DataFrame
+
+        Parameters
+        ----------
+        asset : str
+            Asset in Binance symbol format
+        params : dict
+            Parameters for the API request.
+        columns : list[str]
+            Expected column names for the DataFrame.
+        column_type : dict
+            Expected types for each column.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with `scraped_time` and `asset` columns
+        """
+        # Do not mutate the shared params
+        asset_params = {**params, 'symbol': asset}
+
+        # Make the API request
+        response = self.session.get(self.key, params=asset_params)
+        response.raise_for_status()  # Ensure no HTTP errors
+        data = orjson.loads(response.content)
+
+        # Convert data to typed DataFrame
+        return self.klines_to_df(asset, data, columns, column_type)
+    
+    ##########################################################################
+    
+    @staticmethod
+    def klines_to_df(
+            asset: str,
+            data: list[list],
+            columns: list[str],
+            column_type: dict,
+    ) -> pd.DataFrame:
+        """Convert raw klines to DataFrame with enforced types
+
+        Parameters
+        ----------
+        asset : str
+            Asset in Binance symbol format
+        data : list[list]
+            Raw klines from the API
+        columns : list[str]
+            Expected column names for the DataFrame.
+        column_type : dict
+            Expected types for each column, NumPy or pandas dtype.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with `scraped_time` and `asset` columns
+
+        Raises
+        ------
+        ValueError
+            If type conversion of any column fails
+        """
+        # Build typed records in one pass, instead of casting per column
+        # Column without declared type is kept as object, and inferred
+        # by pandas afterwards, as `pd.DataFrame` would do
+        # Pandas-only dtypes, e.g. 'string', 'category' or 'Int64', 
+        # and unsized str are cast by pandas afterwards
+        fields = []
+        pandas_types = {}
+        for col in columns:
+            if col not in column_type:
+                fields.append((col, np.dtype('object')))
+                continue
+            dtype = column_type[col]
+            try:
+                numpy_dtype = np.dtype(dtype)
+            except TypeError:
+                numpy_dtype = None
+            if (numpy_dtype is None) or (numpy_dtype.itemsize == 0):
+                pandas_types[col] = dtype
+                numpy_dtype = np.dtype('object')
+            fields.append((col, numpy_dtype))
+        
+        rows = [tuple(row) for row in data]
+        try:
+            records = np.array(rows, dtype=np.dtype(fields))
+        except (TypeError, ValueError) as e:
+            # Find the failed column, the error of numpy does not tell
+            for index, (col, numpy_dtype) in enumerate(fields):
+                try:
+                    np.array([row[index] for row in rows], dtype=numpy_dtype)
+                except (TypeError, ValueError) as column_error:
+                    raise ValueError(
+                        f"Type conversion failed for column '{col}': "
+                        f"{column_error}"
+                    )
+            raise ValueError(f"Type conversion failed: {e}")
+        
+        # Convert data to DataFrame
+        df = pd.DataFrame.from_records(records)
+        
+        undeclared_columns = [col for col in columns if col not in column_type]
+        if undeclared_columns:
+            df[undeclared_columns] = df[undeclared_columns].infer_objects()
+        
+        for col, dtype in pandas_types.items():
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError) as e:
+                raise ValueError(
+                    f"Type conversion failed for column '{col}': {e}"
+                )
+
+        # Add metadata columns
+        timestamp = datetime.utcnow()
+        df['scraped_time'] = timestamp
+        df['asset'] = asset
+        
+        return df
+    
+    ##########################################################################
+    
     @staticmethod
     def get_default_dict() -> dict:
         return {
@@ -219,8 +561,9 @@ class BinanceScraper(BaseScraper):
         export_path = os.path.join(export_path, file_name)
         
         # Save
-        with open(export_path, "w") as json_file:
-            json.dump(object, json_file, indent=4)
+        # Encode once and write the whole buffer in a single call
+        with open(export_path, "wb") as json_file:
+            json_file.write(orjson.dumps(object, option=orjson.OPT_INDENT_2))
     
     ##########################################################################
     
@@ -2,33 +2,26 @@
 # Import #
 ##############################################################################
 
-from abc import abstractmethod
+from abc import ABC, abstractmethod
 
 ###########
 # Classes #
 ##############################################################################
 
-class BaseTrader:
+class BaseTrader(ABC):
     @abstractmethod
-    def create_order() -> None:
+    def create_order(self) -> None:
         """Method for create order at market.
         Please also implement logic to create stop loss and take profit
         order.
         """
-        raise NotImplementedError(
-            """Child model does not implement `create_order`"""
-        )
 
     ##########################################################################
     
     @abstractmethod
-    def get_pnl() -> None:
+    def get_pnl(self) -> None:
         """Method to get current pnl.
         """
-        raise NotImplementedError(
-        """child model does not implement `close_all_order`
-        """
-        )
     
     ##########################################################################
 
@@ -2,4 +2,8 @@
 # Import #
 ##############################################################################
 
-from .binance import BinanceTrader
+from .binance import BinanceTrader, get_trader
+from .async_binance import AsyncBinanceTrader
+from .filters import SymbolFilters
+from .stream import UserDataStream
+from .ws_api import WebsocketApi
@@ -0,0 +1,967 @@
+##########
+# Import #
+##############################################################################
+
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import urlencode
+import asyncio
+import hashlib
+import hmac
+import itertools
+import os
+import logging
+import time
+from typing import Any, Awaitable
+
+import aiohttp
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+import numpy as np
+import orjson
+
+from .__base import BaseTrader
+from .binance import BinanceTrader, today_window_ms
+from .client import to_param
+from .filters import SymbolFilters
+from .ws_api import WebsocketApi
+
+###########
+# Classes #
+##############################################################################
+
+class AsyncBinanceTrader(BaseTrader):
+    
+    FUTURES_URL = os.environ.get("FAPI_BASE", "https://fapi.binance.com")
+    
+    # Length of each income history window fetched concurrently
+    INCOME_SLICE_MS = 7 * 24 * 60 * 60 * 1000
+    
+    def __init__(
+            self,
+            api_key: str = os.environ["BINANCE_API_KEY"],
+            secret_key: str = os.environ["BINANCE_SECRET_KEY"],
+            logger: logging.Logger = None,
+            base_url: str = FUTURES_URL,
+            limit_per_host: int = 64,
+            keepalive_timeout: float = 30,
+            max_concurrency: int = 8,
+            symbol_filters_ttl: float = 3600,
+            exchange_info_path: str = SymbolFilters.EXCHANGE_INFO_PATH,
+    ) -> None:
+        """Initiate the AsyncBinanceTrader instance
+        
+        All REST calls go through one keep-alive `aiohttp.ClientSession`,
+        so independent requests can overlap. Use it as an async context
+        manager, or call `close` when done.
+        
+        Parameters
+        ----------
+        api_key : str, optional
+            Binance API key, by default os.environ["BINANCE_API_KEY"]
+        secret_key : str, optional
+            Binance secret key,
+            by default os.environ["BINANCE_SECRET_KEY"]
+        logger : logging.Logger, optional
+            Logger, by default None
+        base_url : str, optional
+            Futures REST endpoint, by default os.environ["FAPI_BASE"]
+            or "https://fapi.binance.com"
+        limit_per_host : int, optional
+            Maximum connections to the endpoint, by default 64
+        keepalive_timeout : float, optional
+            Seconds to keep idle connection, by default 30
+        max_concurrency : int, optional
+            Maximum concurrent close orders, by default 8
+        symbol_filters_ttl : float, optional
+            Seconds before tick and step size are fetched again, 
+            by default 3600
+        exchange_info_path : str, optional
+            File of tick and step size, shared with `BinanceTrader`,
+            by default `SymbolFilters.EXCHANGE_INFO_PATH`
+        """
+        super().__init__()
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.base_url = base_url
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.__session = None
+        self.ws_api = None
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # Set logger if None
+        if not logger:
+            self.logger = logging.getLogger(__name__)
+            logging.basicConfig(
+                level=logging.INFO,
+                format='%(asctime)s - %(levelname)s - %(message)s'
+            )
+        if logger:
+            self.logger = logger
+        
+        # Tick and step size of each symbol, loaded at first use
+        # from `exchange_info_path` if fresh, otherwise from REST
+        self.filters = SymbolFilters(
+            ttl=symbol_filters_ttl,
+            path=exchange_info_path,
+            logger=self.logger,
+        )
+    
+    ##########################################################################
+    
+    async def __aenter__(self) -> "AsyncBinanceTrader":
+        return self
+    
+    ##########################################################################
+    
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+    
+    ##############
+    # Properties #
+    ##########################################################################
+    
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared session, created at first access inside the event loop"""
+        if self.__session is None or self.__session.closed:
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300,
+                ),
+                headers={"X-MBX-APIKEY": self.api_key},
+            )
+        return self.__session
+    
+    ##########################################################################
+    
+    async def connect_ws_api(self, url: str = WebsocketApi.WS_URL) -> None:
+        """Place and cancel orders through the WebSocket API, 
+        REST is still used while it is not connected
+        
+        Parameters
+        ----------
+        url : str, optional
+            WebSocket API endpoint, by default `WebsocketApi.WS_URL`
+        """
+        self.ws_api = WebsocketApi(
+            self.api_key,
+            self.secret_key,
+            session=self.session,
+            logger=self.logger,
+            url=url,
+        )
+        await self.ws_api.connect()
+    
+    ##########################################################################
+    
+    async def close(self) -> None:
+        """Close the WebSocket API and the shared session"""
+        if self.ws_api is not None:
+            await self.ws_api.close()
+            self.ws_api = None
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+    
+    ##########################################################################
+    
+    async def bounded(self, coroutine: Awaitable) -> Any:
+        """Await `coroutine` within the `max_concurrency` limit"""
+        async with self.__semaphore:
+            return await coroutine
+    
+    ########
+    # REST #
+    ##########################################################################
+    
+    def sign(self, params: dict) -> str:
+        """Return the HMAC-SHA256 signed query string of `params`
+        
+        Parameters
+        ----------
+        params : dict
+            Request parameters, `timestamp` is added here
+        
+        Returns
+        -------
+        str
+            Query string ending with `signature`
+        """
+        params["timestamp"] = int(time.time() * 1000)
+        query = urlencode(params)
+        signature = hmac.new(
+            self.secret_key.encode(),
+            query.encode(),
+            hashlib.sha256,
+        ).hexdigest()
+        return f"{query}&signature={signature}"
+    
+    ##########################################################################
+    
+    async def request(
+            self,
+            method: str,
+            path: str,
+            signed: bool = False,
+            **params,
+    ) -> dict | list:
+        """Send request to the futures REST API
+        
+        Parameters
+        ----------
+        method : str
+            HTTP method
+        path : str
+            Endpoint path, e.g. "/fapi/v1/order"
+        signed : bool, optional
+            Sign the request with the secret key, by default False
+        
+        Returns
+        -------
+        dict | list
+            Decoded response
+        
+        Raises
+        ------
+        BinanceAPIException
+            If the server respond with error status
+        """
+        # Binance expects lowercase booleans and plain decimals
+        params = {
+            key: to_param(value)
+            for key, value in params.items()
+            if value is not None
+        }
+        query = self.sign(params) if signed else urlencode(params)
+        url = f"{self.base_url}{path}?{query}" if query \
+            else f"{self.base_url}{path}"
+        
+        # Read the body once, decode it with orjson
+        async with self.session.request(method, url) as response:
+            body = await response.read()
+            if not 200 <= response.status < 300:
+                raise BinanceAPIException(
+                    response, 
+                    response.status, 
+                    body.decode(),
+                )
+            return orjson.loads(body)
+    
+    ##########################################################################
+    
+    async def futures_account(self) -> dict:
+        return await self.request("GET", "/fapi/v2/account", signed=True)
+    
+    ##########################################################################
+    
+    async def futures_account_balance(self) -> list:
+        return await self.request("GET", "/fapi/v2/balance", signed=True)
+    
+    ##########################################################################
+    
+    async def futures_change_leverage(self, **params) -> dict:
+        return await self.request(
+            "POST", "/fapi/v1/leverage", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def futures_symbol_ticker(self, **params) -> dict:
+        return await self.request("GET", "/fapi/v1/ticker/price", **params)
+    
+    ##########################################################################
+    
+    async def futures_exchange_info(self) -> dict:
+        return await self.request("GET", "/fapi/v1/exchangeInfo")
+    
+    ##########################################################################
+    
+    async def futures_create_order(self, **params) -> dict:
+        if (self.ws_api is not None) and self.ws_api.connected:
+            try:
+                return await self.ws_api.request("order.place", **params)
+            except ConnectionError as e:
+                self.logger.warning(f"{e}, place order by REST")
+        return await self.request(
+            "POST", "/fapi/v1/order", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def futures_cancel_order(self, **params) -> dict:
+        if (self.ws_api is not None) and self.ws_api.connected:
+            try:
+                return await self.ws_api.request("order.cancel", **params)
+            except ConnectionError as e:
+                self.logger.warning(f"{e}, cancel order by REST")
+        return await self.request(
+            "DELETE", "/fapi/v1/order", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def futures_get_order(self, **params) -> dict:
+        return await self.request(
+            "GET", "/fapi/v1/order", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def futures_cancel_all_open_orders(self, **params) -> dict:
+        return await self.request(
+            "DELETE", "/fapi/v1/allOpenOrders", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def futures_get_open_orders(self, **params) -> list:
+        return await self.request(
+            "GET", "/fapi/v1/openOrders", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def futures_position_information(self, **params) -> list:
+        return await self.request(
+            "GET", "/fapi/v2/positionRisk", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def futures_income_history(self, **params) -> list:
+        return await self.request(
+            "GET", "/fapi/v1/income", signed=True, **params
+        )
+    
+    ##########################################################################
+    
+    async def available_balance(self, asset: str = "USDT") -> float:
+        """Return the amount balance for asset `asset`
+        
+        Parameters
+        ----------
+        asset : str, optional
+            Target asset, by default "USDT"
+        
+        Returns
+        -------
+        float
+            Float of available balance
+        """
+        # Balance endpoint return only assets, 
+        # instead of the whole account with positions
+        future_account_asset = await self.futures_account_balance()
+        return float(
+            next(
+                item['availableBalance'] \
+                    for item in future_account_asset \
+                        if item['asset'] == asset
+            )
+        )
+    
+    ##########################################################################
+    
+    async def symbol_filters(self, symbol: str) -> tuple[Decimal, Decimal]:
+        """Return tuple(tick size, step size) of `symbol`, same cache
+        as `BinanceTrader.symbol_filters`
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        
+        Returns
+        -------
+        tuple[Decimal, Decimal]
+            `PRICE_FILTER.tickSize` and `LOT_SIZE.stepSize`
+        
+        Raises
+        ------
+        ValueError
+            If `symbol` is not traded on futures
+        """
+        if not self.filters.is_fresh():
+            self.filters.update(await self.futures_exchange_info())
+        return self.filters.get(symbol)
+    
+    ##########################################################################
+    
+    async def get_pnl(self) -> float:
+        """Return the realized PNL of the current UTC day
+        
+        Returns
+        -------
+        float
+            PNL in usdt
+        """
+        return await self.calculate_pnl()
+    
+    ################
+    # Main methods #
+    ##########################################################################
+    # Create order #
+    ################
+    
+    async def create_order(
+            self,
+            symbol: str,
+            position_type: str,
+            tp_percent: float,
+            sl_percent: float,
+            leverage: int,
+    ) -> None:
+        """Create order using current price.
+        
+        Same flow as `BinanceTrader.create_order`, but balance, leverage
+        and ticker are requested together, then the main, take-profit
+        and stop-loss orders are placed together.
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol to crate order
+        position_type : str
+            Type of position, `LONG` or `SHORT`
+        tp_percent : float
+            Percentage for take profit, calculated from current
+            price and leverage
+        sl_percent : float
+            Percentage for stop loss, calculated from current
+            price and leverage
+        leverage : int
+            Multiplier open unit
+        
+        Raises
+        ------
+        ValueError
+            If position type is not correct.
+        """
+        # Clear all past orders and position
+        # Wait, at most 5 seconds, until the server confirm it
+        await self.flatten(symbol, timeout=5)
+        
+        try:
+            if position_type not in BinanceTrader.POSITION_SIDES:
+                raise ValueError(f"{position_type} does not suitable")
+            
+            # Balance, leverage, price and filters do not depend 
+            # on each other
+            balance, _, ticker, _ = await asyncio.gather(
+                self.available_balance(),
+                self.futures_change_leverage(
+                    symbol=symbol,
+                    leverage=leverage,
+                ),
+                self.futures_symbol_ticker(symbol=symbol),
+                self.symbol_filters(symbol),
+            )
+            
+            # Use only 95 % of balance to prevent insufficient margin
+            usdt_balance = balance * 0.95
+            self.logger.info(f"Available USDT balance: {usdt_balance}")
+            
+            # Calculate the maximum quantity based on USDT balance
+            # Also round to the step and tick size of the symbol
+            price = float(ticker['price'])
+            quantity = self.filters.round_quantity(
+                symbol,
+                BinanceTrader.calculate_quantity_from_price(
+                    price, usdt_balance, leverage
+                ),
+            )
+            price = self.filters.round_price(symbol, price)
+            self.logger.info(f"Maximum quantity to buy: {quantity}")
+            
+            # Calculate TP and SL prices
+            take_profit_price, stop_loss_price = \
+                BinanceTrader.calculate_tp_sl_prices(
+                    entry_price=float(price),
+                    tp_percent=tp_percent,
+                    sl_percent=sl_percent,
+                    position_type=position_type,
+                    leverage = leverage,
+                )
+            
+            # Toward the entry, but never on it
+            take_profit_price, stop_loss_price = \
+                self.filters.round_tp_sl_prices(
+                    symbol,
+                    entry_price=price,
+                    take_profit_price=take_profit_price,
+                    stop_loss_price=stop_loss_price,
+                    position_type=position_type,
+                )
+            self.logger.info(f"Take Profit price: {take_profit_price}")
+            self.logger.info(f"Stop Loss price: {stop_loss_price}")
+            
+            side, close_side = BinanceTrader.POSITION_SIDES[position_type]
+            
+            # Orders only depend on price and quantity
+            orders = await asyncio.gather(
+                self.futures_create_order(
+                    symbol=symbol,
+                    side=side,
+                    type=Client.ORDER_TYPE_LIMIT,
+                    quantity=quantity,
+                    price=price,
+                    timeInForce=Client.TIME_IN_FORCE_GTC,
+                ),
+                self.futures_create_order(
+                    symbol=symbol,
+                    side=close_side,
+                    type=Client.FUTURE_ORDER_TYPE_TAKE_PROFIT_MARKET,
+                    quantity=quantity,
+                    stopPrice=take_profit_price,
+                    reduceOnly=True,
+                    timeInForce=Client.TIME_IN_FORCE_GTC,
+                ),
+                self.futures_create_order(
+                    symbol=symbol,
+                    side=close_side,
+                    type=Client.FUTURE_ORDER_TYPE_STOP_MARKET,
+                    quantity=quantity,
+                    stopPrice=stop_loss_price,
+                    reduceOnly=True,
+                    timeInForce=Client.TIME_IN_FORCE_GTC,
+                ),
+                return_exceptions=True,
+            )
+            
+            # Roll back the accepted orders, the entry may be filled
+            failed = [
+                order for order in orders if isinstance(order, Exception)
+            ]
+            if failed:
+                rollbacks = [
+                    self.rollback_order(order, close_filled=(index == 0))
+                    for index, order in enumerate(orders)
+                    if not isinstance(order, Exception)
+                ]
+                for result in await asyncio.gather(
+                        *rollbacks, 
+                        return_exceptions=True,
+                ):
+                    if isinstance(result, Exception):
+                        self.logger.error(
+                            f"Error rolling back order: {result}"
+                        )
+                
+                # Tick or step size may have changed, fetch them again
+                if any(
+                    isinstance(order, BinanceAPIException) 
+                    and order.code in BinanceTrader.FILTER_ERROR_CODES
+                    for order in failed
+                ):
+                    self.filters.invalidate()
+                raise failed[0]
+            
+            market_order, tp_order, sl_order = orders
+            self.logger.info(f"Market order placed: {market_order}")
+            self.logger.info(f"Take Profit order placed: {tp_order}")
+            self.logger.info(f"Stop Loss order placed: {sl_order}")
+        
+        except Exception as e:
+            self.logger.info(f"Error placing orders: {e}", exc_info=True)
+    
+    ##########################################################################
+    
+    async def rollback_order(self, response: dict, close_filled: bool) -> None:
+        """Cancel an accepted order, then close the quantity it 
+        already filled if `close_filled`, 
+        same as `BinanceTrader.rollback_order`
+        
+        Parameters
+        ----------
+        response : dict
+            Respond of the accepted order
+        close_filled : bool
+            Close the filled quantity by a reduceOnly market order,
+            True for entry orders
+        """
+        symbol, order_id = response['symbol'], response['orderId']
+        try:
+            order = await self.futures_cancel_order(
+                symbol=symbol,
+                orderId=order_id,
+            )
+        except BinanceAPIException as e:
+            
+            # Usually already filled, e.g. -2011 Unknown order sent
+            self.logger.error(f"Error cancelling order {order_id}: {e}")
+            try:
+                order = await self.futures_get_order(
+                    symbol=symbol,
+                    orderId=order_id,
+                )
+            except BinanceAPIException as e:
+                if close_filled:
+                    self.logger.error(
+                        f"Order {order_id} of {symbol} may be filled "
+                        f"without take profit and stop loss: {e}"
+                    )
+                return
+        
+        executed_qty = order.get('executedQty', '0')
+        if (not close_filled) or float(executed_qty) == 0:
+            return
+        
+        _, close_side = BinanceTrader.POSITION_SIDES[
+            'LONG' if order.get('side', response['side']) == 'BUY' 
+            else 'SHORT'
+        ]
+        try:
+            close_order = await self.futures_create_order(
+                symbol=symbol,
+                side=close_side,
+                type=Client.ORDER_TYPE_MARKET,
+                quantity=executed_qty,
+                reduceOnly=True,
+            )
+            self.logger.warning(
+                f"Closed {executed_qty} {symbol} filled by order {order_id}: "
+                f"{close_order}"
+            )
+        except BinanceAPIException as e:
+            self.logger.error(
+                f"Position of {symbol} is open without take profit and "
+                f"stop loss, closing {executed_qty} failed: {e}"
+            )
+    
+    ##########################################################################
+    # Manage position #
+    ###################
+    
+    async def close_all_positions(self, symbol: str) -> None:
+        """Force close all positions
+        
+        Parameters
+        ----------
+        symbol : str
+            Target asset
+        """
+        try:
+            positions_info = await self.futures_position_information(
+                symbol=symbol
+            )
+            
+            # Close every non-zero position concurrently
+            close_orders = []
+            for position in positions_info:
+                position_amt = float(position['positionAmt'])
+                if position_amt == 0:
+                    continue
+                
+                _, close_side = BinanceTrader.POSITION_SIDES[
+                    'LONG' if position_amt > 0 else 'SHORT'
+                ]
+                self.logger.info(
+                    f"Closing position for {symbol}, Amount: {position_amt}"
+                )
+                close_orders.append(
+                    self.futures_create_order(
+                        symbol=symbol,
+                        side=close_side,
+                        type=Client.ORDER_TYPE_MARKET,
+                        quantity=abs(position_amt),
+                        reduceOnly=True,
+                    )
+                )
+            
+            if not close_orders:
+                self.logger.info(f"No open positions for {symbol}")
+                return
+            
+            for close_order in await asyncio.gather(
+                    *[self.bounded(order) for order in close_orders]
+            ):
+                self.logger.info(f"Closed position: {close_order}")
+        
+        except BinanceAPIException as e:
+            self.logger.info(f"Error closing position: {e}", exc_info=True)
+        except Exception as e:
+            self.logger.info(f"Unexpected error: {e}", exc_info=True)
+    
+    ##########################################################################
+    
+    async def cancel_all_open_orders(self, symbol: str) -> None:
+        """Cancel all open orders
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        """
+        try:
+            response = await self.futures_cancel_all_open_orders(
+                symbol=symbol
+            )
+            self.logger.info(
+                f"Successfully canceled all open orders for {symbol}: {response}"
+            )
+        except BinanceAPIException as e:
+            self.logger.info(f"Error cancelling orders: {e}", exc_info=True)
+        except Exception as e:
+            self.logger.info(f"Unexpected error: {e}", exc_info=True)
+    
+    ##########################################################################
+    
+    async def flatten(self, symbol: str, timeout: float = 5.0) -> bool:
+        """Cancel open orders and close position of `symbol` 
+        concurrently, then wait until both are confirmed
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        timeout : float, optional
+            Maximum seconds to wait, by default 5.0
+        
+        Returns
+        -------
+        bool
+            True if flat, False if `timeout` is reached
+        """
+        # Cancel and close do not depend on each other
+        await asyncio.gather(
+            self.cancel_all_open_orders(symbol),
+            self.close_all_positions(symbol),
+        )
+        return await self.wait_until_flat(symbol, timeout=timeout)
+    
+    ##########################################################################
+    
+    async def wait_until_flat(
+            self,
+            symbol: str,
+            timeout: float = 5.0,
+            interval: float = 0.1,
+    ) -> bool:
+        """Poll until `symbol` has neither open order nor position
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        timeout : float, optional
+            Maximum seconds to wait, by default 5.0
+        interval : float, optional
+            Seconds between each poll, by default 0.1
+        
+        Returns
+        -------
+        bool
+            True if flat, False if `timeout` is reached
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                open_orders, positions_info = await asyncio.gather(
+                    self.futures_get_open_orders(symbol=symbol),
+                    self.futures_position_information(symbol=symbol),
+                )
+                if not open_orders and all(
+                    float(position['positionAmt']) == 0
+                    for position in positions_info
+                ):
+                    return True
+            except BinanceAPIException as e:
+                self.logger.info(f"Error checking position: {e}")
+            
+            if loop.time() + interval > deadline:
+                self.logger.warning(
+                    f"{symbol} is not flat after {timeout} seconds"
+                )
+                return False
+            await asyncio.sleep(interval)
+    
+    #############
+    # Utilities #
+    ##########################################################################
+    
+    async def income_history(
+            self,
+            start_time_ms: int,
+            end_time_ms: int,
+            income_type: str = 'REALIZED_PNL',
+    ) -> list[dict]:
+        """Fetch every income entry between `start_time_ms` and
+        `end_time_ms`
+        
+        The range is split into `INCOME_SLICE_MS` long slices, 
+        fetched concurrently within the `max_concurrency` limit.
+        
+        Parameters
+        ----------
+        start_time_ms : int
+            Start time in milliseconds
+        end_time_ms : int
+            End time in milliseconds
+        income_type : str, optional
+            Income type, by default 'REALIZED_PNL'
+        
+        Returns
+        -------
+        list[dict]
+            Income entries ordered by time
+        """
+        # Bounds are inclusive, slices must not overlap
+        slices = [
+            (
+                slice_start_ms, 
+                min(slice_start_ms + self.INCOME_SLICE_MS - 1, end_time_ms),
+            )
+            for slice_start_ms in range(
+                start_time_ms, end_time_ms + 1, self.INCOME_SLICE_MS
+            )
+        ]
+        pages = await asyncio.gather(
+            *(
+                self.bounded(
+                    self.income_slice(
+                        slice_start_ms, slice_end_ms, income_type
+                    )
+                )
+                for slice_start_ms, slice_end_ms in slices
+            )
+        )
+        return list(itertools.chain.from_iterable(pages))
+    
+    ##########################################################################
+    
+    async def income_slice(
+            self,
+            start_time_ms: int,
+            end_time_ms: int,
+            income_type: str = 'REALIZED_PNL',
+    ) -> list[dict]:
+        """Fetch every income entry of one slice, following the
+        pages of 1000 rows, same as `BinanceTrader.iter_income_pages`
+        
+        Parameters
+        ----------
+        start_time_ms : int
+            Start time in milliseconds
+        end_time_ms : int
+            End time in milliseconds
+        income_type : str, optional
+            Income type, by default 'REALIZED_PNL'
+        
+        Returns
+        -------
+        list[dict]
+            Income entries ordered by time
+        """
+        income = []
+        seen_tran_ids = set()
+        page_start_ms = start_time_ms
+        
+        while True:
+            page = await self.futures_income_history(
+                incomeType=income_type,
+                startTime=page_start_ms,
+                endTime=end_time_ms,
+                limit=BinanceTrader.INCOME_PAGE_LIMIT,
+            )
+            new_entries = [
+                entry for entry in page 
+                if entry['tranId'] not in seen_tran_ids
+            ]
+            income.extend(new_entries)
+            
+            if (len(page) < BinanceTrader.INCOME_PAGE_LIMIT) \
+                    or (not new_entries):
+                return income
+            
+            # Entries at the last millisecond may continue on the next page
+            page_start_ms = page[-1]['time']
+            seen_tran_ids = {
+                entry['tranId'] for entry in page 
+                if entry['time'] == page_start_ms
+            }
+    
+    ##########################################################################
+    
+    async def calculate_pnl(
+            self,
+            end_time: datetime = None,
+            start_time: datetime = None,
+    ) -> float:
+        """Calculate PNL, if both `end_time` and `start_time` are none,
+        it will use current timestamp as a end_time and 00:00:00
+        of the same date as a `start_date`.
+        
+        Parameters
+        ----------
+        end_time : datetime
+            End date in datetime object
+            , by default is None
+        start_time : datetime
+            Start time in datetime object
+            , by default is None
+        
+        Returns
+        -------
+        float
+            PNL in usdt
+        """
+        try:
+            # Default to today, from UTC midnight until now
+            if (end_time is None) and (start_time is None):
+                start_time_ms, end_time_ms = today_window_ms()
+            else:
+                start_time_ms = int(start_time.timestamp() * 1000)
+                end_time_ms = int(end_time.timestamp() * 1000)
+            
+            pnl_data = await self.income_history(
+                start_time_ms=start_time_ms,
+                end_time_ms=end_time_ms,
+            )
+            
+            # Convert and sum in numpy instead of one float per entry
+            total_pnl = float(
+                np.fromiter(
+                    (entry['income'] for entry in pnl_data),
+                    dtype=np.float64,
+                    count=len(pnl_data),
+                ).sum()
+            )
+            self.logger.info(f"Total Daily PnL: {total_pnl} USDT")
+            
+            return total_pnl
+        
+        except Exception as e:
+            self.logger.info(f"Unexpected error: {e}")
+    
+    ##########################################################################
+    
+    async def calculate_pnl_many(
+            self,
+            windows: list[tuple[datetime, datetime]],
+    ) -> list[float]:
+        """Calculate PNL of many time windows concurrently
+        
+        Parameters
+        ----------
+        windows : list[tuple[datetime, datetime]]
+            Pairs of (start_time, end_time)
+        
+        Returns
+        -------
+        list[float]
+            PNL in usdt of each window, in the same order
+        """
+        # Requests are already bounded inside `income_history`
+        return await asyncio.gather(
+            *(
+                self.calculate_pnl(end_time=end_time, start_time=start_time)
+                for start_time, end_time in windows
+            )
+        )
+    
+    ##########################################################################
+
+##############################################################################
@@ -2,17 +2,31 @@
 # Import #
 ##############################################################################
 
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal, ROUND_FLOOR
+import asyncio
+import functools
 import os
 import logging
-import math
-import traceback
+import operator
+import threading
 import time
+from typing import Callable, Iterator
 
+from cachetools import TTLCache, cachedmethod
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from binance.client import Client
-from binance.exceptions import BinanceAPIException
+from binance.exceptions import BinanceAPIException, BinanceOrderException
 
 from .__base import BaseTrader
+from .client import AsyncProxy, OrjsonClient, to_param
+from .filters import SymbolFilters
+from .rate_limit import WeightedSession
+from .retry import binance_retry, RATE_LIMIT_ERROR_CODES
+from .stream import UserDataStream
 
 ###########
 # Classes #
@@ -20,14 +34,52 @@ from .__base import BaseTrader
 
 class BinanceTrader(BaseTrader):
     
+    # (entry side, close side) of each position type
+    POSITION_SIDES = {
+        'LONG': ('BUY', 'SELL'),
+        'SHORT': ('SELL', 'BUY'),
+    }
+    
+    # Order types that act as a stop loss
+    STOP_LOSS_ORDER_TYPES = frozenset({'STOP_MARKET', 'STOP'})
+    
+    # Error code of "Order would immediately trigger"
+    ORDER_WOULD_IMMEDIATELY_TRIGGER = -2021
+    
+    # Stop loss percent added after each immediately triggered attempt
+    STOP_LOSS_STEP_PERCENT = 0.5
+    
+    # Maximum rows of one income history page
+    INCOME_PAGE_LIMIT = 1000
+    
+    # Error codes of price or quantity not matching the symbol filters
+    FILTER_ERROR_CODES = frozenset({-1111, -4014})
+    
+    # Tick and step size kept between runs
+    EXCHANGE_INFO_PATH = SymbolFilters.EXCHANGE_INFO_PATH
+    
     def __init__(
             self,
             api_key: str = os.environ["BINANCE_API_KEY"],
             secret_key: str = os.environ["BINANCE_SECRET_KEY"],
-            logger: logging.Logger = None
+            logger: logging.Logger = None,
+            symbol_filters_ttl: float = 3600,
+            cache_ttl: float = 5,
+            positions_ttl: float = 2,
+            pool_maxsize: int = 32,
+            exchange_info_path: str = EXCHANGE_INFO_PATH,
+            base_url: str = os.environ.get(
+                "FAPI_BASE", "https://fapi.binance.com"
+            ),
     ) -> None:
         super().__init__()
-        self.client = Client(api_key, secret_key)
+        self.client = OrjsonClient(api_key, secret_key, tld="com")
+        
+        # Futures endpoint, can point to a closer or faster host
+        self.client.FUTURES_URL = f"{base_url}/fapi"
+        
+        # Await client calls without blocking the event loop
+        self.aclient = AsyncProxy(self.client)
         
         # Set logger if None
         if not logger:
@@ -38,28 +90,167 @@ class BinanceTrader(BaseTrader):
             )
         if logger:
             self.logger = logger
+        
+        # Short-lived caches of account lookup
+        self.leverage_cache = TTLCache(maxsize=32, ttl=cache_ttl)
+        self.balance_cache = TTLCache(maxsize=1, ttl=cache_ttl)
+        self.positions_cache = TTLCache(maxsize=1, ttl=positions_ttl)
+        self.positions_lock = threading.Lock()
+        
+        # Tick and step size of each symbol, loaded at first use
+        # from `exchange_info_path` if fresh, otherwise from REST
+        self.filters = SymbolFilters(
+            ttl=symbol_filters_ttl,
+            path=exchange_info_path,
+            logger=self.logger,
+        )
+        
+        # Throttle every REST call of the client by request weight
+        # Keep up to `pool_maxsize` connections alive to the one host, 
+        # so concurrent calls do not open a new TLS connection
+        # Only failed connects are retried here, the request was never 
+        # sent, so it is safe even for order placement
+        weighted_session = WeightedSession(logger=self.logger)
+        weighted_session.headers.update(self.client.session.headers)
+        weighted_session.headers["Connection"] = "keep-alive"
+        adapter = HTTPAdapter(
+            pool_connections=1, 
+            pool_maxsize=pool_maxsize, 
+            pool_block=False,
+            max_retries=Retry(
+                total=None,
+                connect=3,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=0.2,
+                raise_on_status=False,
+            ),
+        )
+        weighted_session.mount("https://", adapter)
+        weighted_session.mount("http://", adapter)
+        self.client.session = weighted_session
+        
+        # Pushed account state, see `start_user_stream`
+        self.stream = None
+        
+        # Retry transient errors of the client calls
+        # Order placement only retry when rejected by rate limit
+        for name in (
+                "futures_cancel_all_open_orders",
+                "futures_position_information",
+                "futures_income_history",
+        ):
+            setattr(
+                self.client, 
+                name, 
+                binance_retry()(getattr(self.client, name)),
+            )
+        self.client.futures_create_order = binance_retry(
+            codes=RATE_LIMIT_ERROR_CODES
+        )(self.client.futures_create_order)
+        
+        # Any placed order can change positions, drop the snapshot
+        for name in ("futures_create_order", "futures_place_batch_order"):
+            setattr(
+                self.client, 
+                name, 
+                self.invalidate_positions_after(getattr(self.client, name)),
+            )
+        
+        # Open the futures connection now, not at the first order
+        self.client.futures_ping()
     
     ##############
     # Properties #
     ##########################################################################
     
-    @property
-    def get_leverage(self, symbol: str) -> int:
+    def get_leverage(
+            self, 
+            symbol: str, 
+            position_info: dict = None,
+    ) -> int:
+        """Return leverage of `symbol`, from `position_info` if given,
+        then the user data stream if started, otherwise from REST 
+        cached for a few seconds
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        position_info : dict, optional
+            Position of `symbol` already fetched, by default None
+
+        Returns
+        -------
+        int
+            Leverage, None if not found
+        """
+        if position_info and ('leverage' in position_info):
+            return int(position_info['leverage'])
+        
+        if (self.stream is not None) and self.stream.ready.is_set():
+            position = self.stream.position(symbol)
+            if position and ('leverage' in position):
+                return int(position['leverage'])
+        return self.fetch_leverage(symbol)
+    
+    ##########################################################################
+    
+    @cachedmethod(
+        operator.attrgetter('leverage_cache'), 
+        key=lambda self, symbol: symbol,
+    )
+    def fetch_leverage(self, symbol: str) -> int:
+        """Return leverage of `symbol` from REST, cached for a few seconds
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+
+        Returns
+        -------
+        int
+            Leverage, None if not found
+        """
         try:
-            response = self.client.futures_position_information(symbol=symbol)
-            for position in response:
-                if position['symbol'] == symbol:
-                    return int(position['leverage'])
-            return None
+            # Share the position snapshot with other lookups
+            position = self.positions_map().get(symbol)
+            if position is None:
+                return None
+            return int(position['leverage'])
         except Exception as e:
             print(f"Error getting leverage: {e}")
             return None
 
     ##########################################################################
     
-    @property
+    @cachedmethod(
+        operator.attrgetter('balance_cache'), 
+        key=lambda self: 'balances',
+    )
+    def balances(self) -> dict[str, float]:
+        """Return available balance of every asset, keyed by asset,
+        cached for a few seconds
+
+        Returns
+        -------
+        dict[str, float]
+            Available balance of each asset
+        """
+        # Balance endpoint return only assets, 
+        # instead of the whole account with positions
+        return {
+            item['asset']: float(item['availableBalance'])
+            for item in self.client.futures_account_balance()
+        }
+    
+    ##########################################################################
+    
     def available_balance(self, asset: str = "USDT") -> float:
-        """Return the amount balance for asset `asset`
+        """Return the amount balance for asset `asset`, 
+        cached for a few seconds
 
         Parameters
         ----------
@@ -71,23 +262,142 @@ class BinanceTrader(BaseTrader):
         float
             Float of available balance
         """
-        future_account_asset = self.client.futures_account()['assets']
+        return self.balances()[asset]
+    
+    ##########################################################################
+    
+    def start_user_stream(self, symbols: list[str] = None) -> None:
+        """Follow positions, open orders and realized PnL of today 
+        by the user data stream, and mark price of `symbols`, 
+        instead of polling REST
+
+        Parameters
+        ----------
+        symbols : list[str], optional
+            Symbols to follow the mark price, by default None
+        """
+        self.stream = UserDataStream(
+            self.client, 
+            logger=self.logger,
+            income_pages=self.iter_income_pages,
+        )
+        self.stream.start(symbols)
+    
+    ##########################################################################
+    
+    def stop_user_stream(self) -> None:
+        """Close the user data stream, back to REST polling"""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+    
+    ##########################################################################
+    
+    def get_position(self, symbol: str) -> dict:
+        """Return position of `symbol`, from the user data stream
+        if started, otherwise from REST
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+
+        Returns
+        -------
+        dict
+            Position, None if there is no record
+        """
+        if (self.stream is not None) and self.stream.ready.is_set():
+            return self.stream.position(symbol)
+        return self.positions_map().get(symbol)
+    
+    ##########################################################################
+    
+    def get_mark_price(self, symbol: str) -> float:
+        """Return mark price of `symbol`, from the mark price stream
+        if followed, otherwise from REST
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+
+        Returns
+        -------
+        float
+            Mark price
+        """
+        if self.stream is not None:
+            mark_price = self.stream.mark_price(symbol)
+            if mark_price is not None:
+                return mark_price
         return float(
-            next(
-                item['availableBalance'] \
-                    for item in future_account_asset \
-                        if item['asset'] == asset
-            )
+            self.client.futures_mark_price(symbol=symbol)['markPrice']
         )
     
     ##########################################################################
     
+    def get_open_orders(self, symbol: str) -> list[dict]:
+        """Return open orders of `symbol`, from the user data stream
+        if started, otherwise from REST
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+
+        Returns
+        -------
+        list[dict]
+            Open orders
+        """
+        if (self.stream is not None) and self.stream.ready.is_set():
+            return self.stream.open_orders(symbol)
+        return self.client.futures_get_open_orders(symbol=symbol)
+    
+    ##########################################################################
+    
+    @cachedmethod(
+        operator.attrgetter('positions_cache'), 
+        lock=operator.attrgetter('positions_lock'),
+    )
+    def positions_map(self) -> dict[str, dict]:
+        """Return position of every symbol, keyed by symbol.
+        
+        One request serve every symbol handled within 
+        `positions_ttl` seconds.
+
+        Returns
+        -------
+        dict[str, dict]
+            Position information of each symbol
+        """
+        return {
+            position['symbol']: position 
+            for position in self.client.futures_position_information()
+        }
+    
+    ##########################################################################
+    
     @property
     def daily_pnl(self) -> float:
         return self.calculate_pnl()
     
     ##########################################################################
     
+    def get_pnl(self) -> float:
+        """Return the realized PNL of the current UTC day
+
+        Returns
+        -------
+        float
+            PNL in usdt
+        """
+        return self.calculate_pnl()
+    
+    ##########################################################################
+    
+    @binance_retry()
     def set_leverage(self, symbol: str, leverage: int) -> dict:
         """Set leverage  of symbol
 
@@ -109,6 +419,7 @@ class BinanceTrader(BaseTrader):
             symbol=symbol, 
             leverage=leverage,
         )
+        self.leverage_cache[symbol] = leverage
         return response
     
     ################
@@ -151,91 +462,213 @@ class BinanceTrader(BaseTrader):
             If position type is not correct.
         """
         # Clear all past orders and position
-        # Delay 5 second to ensure the respond from server
-        self.cancel_all_open_orders(symbol)
-        self.close_all_positions(symbol)
-        time.sleep(5)
+        # Wait, at most 5 seconds, until the server confirm it
+        self.flatten(symbol, timeout=5)
         
         try:
-            if position_type not in ('LONG', 'SHORT'):
+            if position_type not in self.POSITION_SIDES:
                 raise ValueError(f"{position_type} does not suitable")
             
             # Get available USDT balance
             # Use only 95 % of balance to prevent insufficient margin
-            usdt_balance = self.available_balance * 0.95
+            # Balance was changed by closing positions
+            self.balance_cache.clear()
+            usdt_balance = self.available_balance() * 0.95
             self.logger.info(f"Available USDT balance: {usdt_balance}")
 
+            # Get current price, once for both quantity and order
+            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            price = float(ticker['price'])
+            
             # Calculate the maximum quantity based on USDT balance
             # Also round the precision
             self.set_leverage(symbol, leverage)
-            quantity = self.calculate_quantity(symbol, usdt_balance, leverage)
-            quantity = self.round_to_precision(quantity)
-            
-            # Get current price
-            ticker = self.client.futures_symbol_ticker(symbol=symbol)
-            price = float(ticker['price'])
-            price = self.round_to_precision(price)
+            quantity = self.calculate_quantity(
+                symbol, usdt_balance, leverage, current_price=price
+            )
+            quantity = self.round_quantity(symbol, quantity)
+            price = self.round_price(symbol, price)
             self.logger.info(f"Maximum quantity to buy: {quantity}")
             
             # Calculate TP and SL prices
             take_profit_price, stop_loss_price = self.calculate_tp_sl_prices(
-                entry_price=price,
+                entry_price=float(price),
                 tp_percent=tp_percent,
                 sl_percent=sl_percent,
                 position_type=position_type,
                 leverage = leverage,
             )
+            
+            # Toward the entry, but never on it
+            take_profit_price, stop_loss_price = \
+                self.filters.round_tp_sl_prices(
+                    symbol,
+                    entry_price=price,
+                    take_profit_price=take_profit_price,
+                    stop_loss_price=stop_loss_price,
+                    position_type=position_type,
+                )
             self.logger.info(f"Take Profit price: {take_profit_price}")
             self.logger.info(f"Stop Loss price: {stop_loss_price}")
             
-            # Place a Market Order (long or short based on position_type)
-            if position_type == 'LONG':
-                market_order = self.client.futures_create_order(
-                    symbol=symbol,
-                    side=Client.SIDE_BUY,
-                    type=Client.ORDER_TYPE_LIMIT,
-                    quantity=quantity,
-                    price=price,
-                    timeInForce=Client.TIME_IN_FORCE_GTC,
-                )
-            elif position_type == 'SHORT':
-                market_order = self.client.futures_create_order(
-                    symbol=symbol,
-                    side=Client.SIDE_SELL,
-                    type=Client.ORDER_TYPE_LIMIT,
-                    quantity=quantity,
-                    price=price,
-                    timeInForce=Client.TIME_IN_FORCE_GTC,
-                )
+            side, close_side = self.POSITION_SIDES[position_type]
+            
+            # Take profit and stop loss share every field but type and price
+            exit_order = {
+                "symbol": symbol,
+                "side": close_side,
+                "quantity": quantity,
+                "reduceOnly": True,
+                "timeInForce": 'GTC',
+            }
+            
+            # Place the main, take profit and stop loss orders 
+            # in one signed request
+            market_order, tp_order, sl_order = self.futures_batch_orders(
+                [
+                    {
+                        "symbol": symbol,
+                        "side": side,
+                        "type": 'LIMIT',
+                        "quantity": quantity,
+                        "price": price,
+                        "timeInForce": 'GTC',
+                    },
+                    {
+                        **exit_order,
+                        "type": 'TAKE_PROFIT_MARKET',
+                        "stopPrice": take_profit_price,
+                    },
+                    {
+                        **exit_order,
+                        "type": 'STOP_MARKET',
+                        "stopPrice": stop_loss_price,
+                    },
+                ]
+            )
             self.logger.info(f"Market order placed: {market_order}")
+            self.logger.info(f"Take Profit order placed: {tp_order}")
+            self.logger.info(f"Stop Loss order placed: {sl_order}")
+            
+        except Exception as e:
+            self.logger.info(f"Error placing orders: {e}", exc_info=True)
+    
+    ##########################################################################
+    
+    @binance_retry(codes=RATE_LIMIT_ERROR_CODES)
+    def futures_batch_orders(self, orders: list[dict]) -> list[dict]:
+        """Place up to 5 orders in one `POST /fapi/v1/batchOrders`.
+        
+        If any order is rejected, the accepted ones are cancelled.
+        An entry may already be filled, then its filled quantity is
+        closed by a reduceOnly market order, see `rollback_order`.
 
-            # Place a Take Profit order
-            tp_order = self.client.futures_create_order(
+        Parameters
+        ----------
+        orders : list[dict]
+            Parameters of each order, as in `futures_create_order`
+
+        Returns
+        -------
+        list[dict]
+            Respond of each order, in the same order as `orders`
+
+        Raises
+        ------
+        BinanceOrderException
+            If any order in the batch is rejected
+        """
+        # Every value is sent as string inside the JSON-encoded list
+        batch_orders = [
+            {key: to_param(value) for key, value in order.items()}
+            for order in orders
+        ]
+        responses = self.client.futures_place_batch_order(
+            batchOrders=batch_orders
+        )
+        
+        # Failed order is returned as {"code": ..., "msg": ...}
+        failed = [response for response in responses if 'code' in response]
+        if failed:
+            for order, response in zip(orders, responses):
+                if 'orderId' in response:
+                    self.rollback_order(
+                        response, 
+                        close_filled=not order.get('reduceOnly'),
+                    )
+            
+            # Tick or step size may have changed, fetch them again
+            if any(
+                response['code'] in self.FILTER_ERROR_CODES 
+                for response in failed
+            ):
+                self.invalidate_exchange_info()
+            raise BinanceOrderException(failed[0]['code'], failed[0]['msg'])
+        
+        return responses
+    
+    ##########################################################################
+    
+    def rollback_order(self, response: dict, close_filled: bool) -> None:
+        """Cancel an accepted order of a failed batch, then close 
+        the quantity it already filled if `close_filled`
+        
+        Parameters
+        ----------
+        response : dict
+            Respond of the accepted order
+        close_filled : bool
+            Close the filled quantity by a reduceOnly market order,
+            True for entry orders
+        """
+        symbol, order_id = response['symbol'], response['orderId']
+        try:
+            order = self.client.futures_cancel_order(
                 symbol=symbol,
-                side=Client.SIDE_SELL if position_type == 'LONG' else Client.SIDE_BUY,
-                type=Client.FUTURE_ORDER_TYPE_TAKE_PROFIT_MARKET,
-                quantity=quantity,
-                stopPrice=take_profit_price,
-                reduceOnly=True,
-                timeInForce=Client.TIME_IN_FORCE_GTC,
+                orderId=order_id,
             )
-            self.logger.info(f"Take Profit order placed: {tp_order}")
-
-            # Place a Stop Loss order
-            sl_order = self.client.futures_create_order(
+        except BinanceAPIException as e:
+            
+            # Usually already filled, e.g. -2011 Unknown order sent
+            self.logger.error(f"Error cancelling order {order_id}: {e}")
+            try:
+                order = self.client.futures_get_order(
+                    symbol=symbol,
+                    orderId=order_id,
+                )
+            except BinanceAPIException as e:
+                if close_filled:
+                    self.logger.error(
+                        f"Order {order_id} of {symbol} may be filled "
+                        f"without take profit and stop loss: {e}"
+                    )
+                return
+        
+        executed_qty = order.get('executedQty', '0')
+        if (not close_filled) or float(executed_qty) == 0:
+            return
+        
+        _, close_side = self.POSITION_SIDES[
+            'LONG' if order.get('side', response['side']) == 'BUY' 
+            else 'SHORT'
+        ]
+        try:
+            close_order = self.client.futures_create_order(
                 symbol=symbol,
-                side=Client.SIDE_SELL if position_type == 'LONG' else Client.SIDE_BUY,
-                type=Client.FUTURE_ORDER_TYPE_STOP_MARKET,
-                quantity=quantity,
-                stopPrice=stop_loss_price,
+                side=close_side,
+                type='MARKET',
+                quantity=executed_qty,
                 reduceOnly=True,
-                timeInForce=Client.TIME_IN_FORCE_GTC,
             )
-            self.logger.info(f"Stop Loss order placed: {sl_order}")
-            
-        except Exception as e:
-            self.logger.info(traceback.format_exc())
-            self.logger.info(f"Error placing orders: {e}")
+            self.logger.warning(
+                f"Closed {executed_qty} {symbol} filled by order {order_id}: "
+                f"{close_order}"
+            )
+        except BinanceAPIException as e:
+            self.logger.error(
+                f"Position of {symbol} is open without take profit and "
+                f"stop loss, closing {executed_qty} failed: {e}"
+            )
     
     ##########################################################################
     # Manage position #
@@ -250,55 +683,114 @@ class BinanceTrader(BaseTrader):
             Target asset
         """
         try:
-            # Get the current positions information
-            positions_info = self.client.futures_position_information()
+            # Only rows of `symbol`, filtered by the server
+            # Hedge mode has both LONG and SHORT rows
+            if (self.stream is not None) and self.stream.ready.is_set():
+                positions_info = self.stream.positions(symbol)
+            else:
+                positions_info = self.client.futures_position_information(
+                    symbol=symbol
+                )
             
-            # Loop all position found
-            for position in positions_info:
-                if position['symbol'] == symbol:
-                    
-                    # Get the position amount (positive for long, negative for short)
-                    position_amt = float(position['positionAmt']) 
-                    
-                    # Close long position by selling
-                    if position_amt > 0:
-                        self.logger.info(
-                            f"Closing LONG position for {symbol}, Amount: {position_amt}"
-                        )
-                        close_order = self.client.futures_create_order(
-                            symbol=symbol,
-                            side=Client.SIDE_SELL,
-                            type=Client.ORDER_TYPE_MARKET,
-                            quantity=abs(position_amt)
-                        )
-                        self.logger.info(
-                            f"Closed LONG position: {close_order}"
-                        )
+            # Early exit without an open position
+            open_positions = [
+                position for position in positions_info 
+                if float(position['positionAmt']) != 0
+            ]
+            if not open_positions:
+                self.logger.info(f"No open positions for {symbol}")
+                return
+            
+            # Close long position by selling, short position by buying
+            for position in open_positions:
+                self.close_position(position)
                     
-                    # Close short position by buying
-                    elif position_amt < 0:
-                        self.logger.info(
-                            f"Closing SHORT position for {symbol}, Amount: {position_amt}"
-                        )
-                        close_order = self.client.futures_create_order(
-                            symbol=symbol,
-                            side=Client.SIDE_BUY,
-                            type=Client.ORDER_TYPE_MARKET,
-                            quantity=abs(position_amt)  
-                        )
-                        self.logger.info(
-                            f"Closed SHORT position: {close_order}"
-                        )
-                        
-                    else:
-                        self.logger.info(f"No open positions for {symbol}")
-                        
         except BinanceAPIException as e:
-            self.logger.info(f"Error closing position: {e}")
-            traceback.print_exc()
+            self.logger.info(f"Error closing position: {e}", exc_info=True)
         except Exception as e:
-            self.logger.info(f"Unexpected error: {e}")
-            traceback.print_exc()
+            self.logger.info(f"Unexpected error: {e}", exc_info=True)
+    
+    ##########################################################################
+    
+    def close_positions(
+            self, 
+            symbols: list[str] = None, 
+            max_workers: int = 8,
+    ) -> None:
+        """Force close positions of many symbols concurrently
+
+        Parameters
+        ----------
+        symbols : list[str], optional
+            Target symbols, every open position if None, 
+            by default None
+        max_workers : int, optional
+            Maximum number of concurrent close orders, by default 8
+        """
+        positions = [
+            position for symbol, position in self.positions_map().items()
+            if (symbols is None or symbol in symbols) \
+                and float(position['positionAmt']) != 0
+        ]
+        if not positions:
+            self.logger.info(f"No open positions for {symbols}")
+            return
+        
+        def close(position: dict) -> dict:
+            try:
+                return self.close_position(position)
+            except Exception as e:
+                self.logger.info(
+                    f"Error closing position of {position['symbol']}: {e}"
+                )
+        
+        # Each close order is independent from the others
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(positions))
+        ) as executor:
+            list(executor.map(close, positions))
+    
+    ##########################################################################
+    
+    def close_position(self, position: dict) -> dict:
+        """Close `position` with market order
+
+        Parameters
+        ----------
+        position : dict
+            Position information of one symbol
+
+        Returns
+        -------
+        dict
+            Respond of close order, None if there is no position
+        """
+        symbol = position['symbol']
+        
+        # Get the position amount (positive for long, negative for short)
+        position_amt = float(position['positionAmt'])
+        if position_amt == 0:
+            return None
+        
+        position_type = 'LONG' if position_amt > 0 else 'SHORT'
+        _, close_side = self.POSITION_SIDES[position_type]
+        self.logger.info(
+            f"Closing {position_type} position for {symbol}, Amount: {position_amt}"
+        )
+        close_order = self.client.futures_create_order(
+            symbol=symbol,
+            side=close_side,
+            type=Client.ORDER_TYPE_MARKET,
+            # Amount of the position is already a multiple of step size
+            quantity=to_param(
+                Decimal(str(position['positionAmt'])).copy_abs()
+            ),
+            reduceOnly=True,
+        )
+        self.logger.info(
+            f"Closed {position_type} position: {close_order}"
+        )
+        return close_order
     
     ##########################################################################
     
@@ -326,16 +818,13 @@ class BinanceTrader(BaseTrader):
         """
         try:
             # Get the current position for the symbol
-            positions_info = self.client.futures_position_information()
+            position = self.get_position(symbol)
             position_amt = 0.0
             entry_price = 0.0
 
-            # Loop over positions to find the symbol
-            for position in positions_info:
-                if position['symbol'] == symbol:
-                    position_amt = float(position['positionAmt'])
-                    entry_price = float(position['entryPrice'])
-                    break
+            if position:
+                position_amt = float(position['positionAmt'])
+                entry_price = float(position['entryPrice'])
 
             # If no open position, exit the function
             if position_amt == 0.0:
@@ -347,35 +836,55 @@ class BinanceTrader(BaseTrader):
             )
 
             # Check open orders to see if there's an existing stop-loss order
-            open_orders = self.client.futures_get_open_orders(symbol=symbol)
-            has_stop_loss = False
-            for order in open_orders:
-                if order['type'] == 'STOP_MARKET':
-                    has_stop_loss = True
-                    self.logger.info(f"Stop-loss already exists for {symbol}")
-                    break
-
+            open_orders = self.get_open_orders(symbol)
             # If a stop-loss exists, return without doing anything
-            if has_stop_loss:
+            if any(
+                order['type'] in self.STOP_LOSS_ORDER_TYPES 
+                for order in open_orders
+            ):
+                self.logger.info(f"Stop-loss already exists for {symbol}")
                 return
 
             # If no stop-loss, calculate and create one with retry logic
             # Calculate stop-loss price based on position type (long/short)
-            while stop_loss_percent <= max_stop_loss_percent:
+            # Long position close by selling, short position by buying
+            sign = 1.0 if position_amt > 0 else -1.0
+            _, stop_loss_side = self.POSITION_SIDES[
+                'LONG' if position_amt > 0 else 'SHORT'
+            ]
+            
+            # Mark price, to skip stop prices that would 
+            # immediately trigger without sending them
+            # Without it, the exchange rejects them instead
+            try:
+                mark_price = self.get_mark_price(symbol)
+            except Exception as e:
+                self.logger.warning(f"Error getting mark price: {e}")
+                mark_price = None
+            
+            # Bounded by attempt count, not by float comparison
+            initial_stop_loss_percent = stop_loss_percent
+            max_attempts = int(
+                (max_stop_loss_percent - initial_stop_loss_percent) \
+                    // self.STOP_LOSS_STEP_PERCENT
+            ) + 1
+            for attempt in range(max_attempts):
+                stop_loss_percent = initial_stop_loss_percent \
+                    + attempt * self.STOP_LOSS_STEP_PERCENT
                 try:
-                    
-                    # Long position
-                    if position_amt > 0: 
-                        stop_loss_price = entry_price * (1 - (stop_loss_percent / 100)/leverage)
-                        stop_loss_side = Client.SIDE_SELL
-                    
-                    # Short position
-                    else: 
-                        stop_loss_price = entry_price * (1 + (stop_loss_percent / 100)/leverage )
-                        stop_loss_side = Client.SIDE_BUY
+                    stop_loss_price = entry_price * (
+                        1.0 - sign * (stop_loss_percent * 0.01 / leverage)
+                    )
 
                     # Round stop-loss price to correct precision
-                    stop_loss_price = self.round_down_to_precision(stop_loss_price)
+                    stop_loss_price = self.round_price(symbol, stop_loss_price)
+                    if (mark_price is not None) \
+                            and sign * (mark_price - float(stop_loss_price)) <= 0:
+                        self.logger.info(
+                            f"Stop-loss {stop_loss_price} would immediately trigger at mark price {mark_price}, skip"
+                        )
+                        continue
+                    
                     self.logger.info(
                         f"Attempting to create stop-loss at {stop_loss_price} with {stop_loss_percent}% threshold for {symbol}"
                     )
@@ -385,8 +894,8 @@ class BinanceTrader(BaseTrader):
                         symbol=symbol,
                         side=stop_loss_side,
                         type='STOP_MARKET',
-                        stopPrice=stop_loss_price,
-                        quantity=abs(position_amt)
+                        stopPrice=to_param(stop_loss_price),
+                        quantity=to_param(abs(position_amt)),
                     )
                     self.logger.info(f"Stop-loss created successfully: {stop_loss_order}")
                     
@@ -396,35 +905,30 @@ class BinanceTrader(BaseTrader):
                 except BinanceAPIException as e:
                     
                     # Check if the error is due to "Order would immediately trigger"
-                    if "Order would immediately trigger" in str(e):
+                    # Retry with the next stop loss percent
+                    if e.code == self.ORDER_WOULD_IMMEDIATELY_TRIGGER:
                         self.logger.warning(
-                            f"Stop-loss failed: {e}. Increasing stop-loss percent to {stop_loss_percent + 0.5}%"
+                            f"Stop-loss failed: {e}. Increasing stop-loss percent to {stop_loss_percent + self.STOP_LOSS_STEP_PERCENT}%"
                         )
-                        
-                        # Increment stop loss by 0.5% and retry
-                        stop_loss_percent += 0.5 
                     else:
-                        self.logger.error(f"Error creating stop-loss: {e}")
-                        traceback.print_exc()
+                        self.logger.exception(f"Error creating stop-loss: {e}")
                         
                         # Break loop for other API errors
                         break  
                 except Exception as e:
-                    self.logger.error(f"Unexpected error: {e}")
-                    traceback.print_exc()
+                    self.logger.exception(f"Unexpected error: {e}")
                     break
 
-            if stop_loss_percent > max_stop_loss_percent:
+            # Every attempt would immediately trigger
+            else:
                 self.logger.error(
                     f"Failed to create stop-loss for {symbol} after reaching max stop-loss percent of {max_stop_loss_percent}%."
                 )
 
         except BinanceAPIException as e:
-            self.logger.error(f"Error checking/creating stop-loss: {e}")
-            traceback.print_exc()
+            self.logger.exception(f"Error checking/creating stop-loss: {e}")
         except Exception as e:
-            self.logger.error(f"Unexpected error: {e}")
-            traceback.print_exc()
+            self.logger.exception(f"Unexpected error: {e}")
 
     ##########################################################################
     
@@ -443,21 +947,165 @@ class BinanceTrader(BaseTrader):
                 f"Successfully canceled all open orders for {symbol}: {response}"
             )
         except BinanceAPIException as e:
-            self.logger.info(f"Error cancelling orders: {e}")
-            traceback.print_exc()
+            self.logger.info(f"Error cancelling orders: {e}", exc_info=True)
         except Exception as e:
-            self.logger.info(f"Unexpected error: {e}")
-            traceback.print_exc()
+            self.logger.info(f"Unexpected error: {e}", exc_info=True)
+
+    ##########################################################################
+    
+    def flatten(self, symbol: str, timeout: float = 5.0) -> bool:
+        """Cancel open orders and close position of `symbol` 
+        concurrently, then wait until both are confirmed
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        timeout : float, optional
+            Maximum seconds to wait, by default 5.0
 
+        Returns
+        -------
+        bool
+            True if flat, False if `timeout` is reached
+        """
+        # Cancel and close do not depend on each other
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(self.cancel_all_open_orders, symbol)
+            executor.submit(self.close_all_positions, symbol)
+        return self.wait_until_flat(symbol, timeout=timeout)
+    
+    ##########################################################################
+    
+    def wait_until_flat(
+            self, 
+            symbol: str, 
+            timeout: float = 5.0, 
+            interval: float = 0.1,
+    ) -> bool:
+        """Wait until `symbol` has neither open order nor position.
+        
+        With the user data stream, wait for its events, 
+        otherwise poll REST every `interval` seconds.
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        timeout : float, optional
+            Maximum seconds to wait, by default 5.0
+        interval : float, optional
+            Seconds between each poll, by default 0.1
+
+        Returns
+        -------
+        bool
+            True if flat, False if `timeout` is reached
+        """
+        if (self.stream is not None) and self.stream.ready.is_set():
+            if self.stream.wait_until_flat(symbol, timeout=timeout):
+                return True
+            self.logger.warning(
+                f"{symbol} is not flat after {timeout} seconds"
+            )
+            return False
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                open_orders = self.client.futures_get_open_orders(
+                    symbol=symbol
+                )
+                positions_info = self.client.futures_position_information(
+                    symbol=symbol
+                )
+                if not open_orders and all(
+                    float(position['positionAmt']) == 0 
+                    for position in positions_info
+                ):
+                    return True
+            except BinanceAPIException as e:
+                self.logger.info(f"Error checking position: {e}")
+            
+            if time.monotonic() + interval > deadline:
+                self.logger.warning(
+                    f"{symbol} is not flat after {timeout} seconds"
+                )
+                return False
+            time.sleep(interval)
+    
+    #########
+    # Async #
+    ##########################################################################
+    
+    async def create_order_async(self, *args, **kwargs) -> None:
+        """`create_order` in a worker thread, for event loop callers"""
+        return await asyncio.to_thread(self.create_order, *args, **kwargs)
+    
+    ##########################################################################
+    
+    async def close_all_positions_async(self, symbol: str) -> None:
+        """`close_all_positions` in a worker thread, 
+        for event loop callers
+        """
+        return await asyncio.to_thread(self.close_all_positions, symbol)
+    
+    ##########################################################################
+    
+    async def calculate_pnl_async(self, *args, **kwargs) -> float:
+        """`calculate_pnl` in a worker thread, for event loop callers"""
+        return await asyncio.to_thread(self.calculate_pnl, *args, **kwargs)
+    
+    ##########################################################################
+    
+    async def check_and_create_stop_loss_async(
+            self, 
+            *args, 
+            **kwargs,
+    ) -> None:
+        """`check_and_create_stop_loss` in a worker thread, 
+        for event loop callers
+        """
+        return await asyncio.to_thread(
+            self.check_and_create_stop_loss, 
+            *args, 
+            **kwargs,
+        )
+    
     #############
     # Utilities #
     ##########################################################################
     
+    def invalidate_positions_after(self, func: Callable) -> Callable:
+        """Wrap `func`, so the positions snapshot is dropped 
+        as soon as it returns
+
+        Parameters
+        ----------
+        func : Callable
+            Client method that place orders
+
+        Returns
+        -------
+        Callable
+            Wrapped method
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            response = func(*args, **kwargs)
+            with self.positions_lock:
+                self.positions_cache.clear()
+            return response
+        return wrapper
+    
+    ##########################################################################
+    
     def calculate_quantity(
             self, 
             symbol: str, 
             usdt_balance: float, 
-            leverage: int    
+            leverage: int,
+            current_price: float = None,
     ) -> float:
         """Calculate quantity to buy
 
@@ -469,6 +1117,9 @@ class BinanceTrader(BaseTrader):
             Balance to buy
         leverage : int
             Leverage to multiply quantity
+        current_price : float, optional
+            Price already fetched by the caller, 
+            fetched from the ticker if None, by default None
 
         Returns
         -------
@@ -476,11 +1127,40 @@ class BinanceTrader(BaseTrader):
             Float of quantity with 6th precision
         """
         # Fetch current price for the symbol (e.g., BTCUSDT)
-        ticker = self.client.futures_symbol_ticker(symbol=symbol)
-        current_price = float(ticker['price'])
+        if current_price is None:
+            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            current_price = float(ticker['price'])
         
+        return self.calculate_quantity_from_price(
+            current_price, usdt_balance, leverage
+        )
+    
+    ##########################################################################
+    
+    @staticmethod
+    def calculate_quantity_from_price(
+            price: float, 
+            usdt_balance: float, 
+            leverage: int    
+    ) -> float:
+        """Calculate quantity to buy at known `price`
+
+        Parameters
+        ----------
+        price : float
+            Current price of target symbol
+        usdt_balance : float
+            Balance to buy
+        leverage : int
+            Leverage to multiply quantity
+
+        Returns
+        -------
+        float
+            Float of quantity with 6th precision
+        """
         # Calculate maximum quantity you can buy with leverage
-        quantity = (usdt_balance * leverage) / current_price
+        quantity = (usdt_balance * leverage) / price
         return round(quantity, 6) 
 
     ##########################################################################
@@ -493,7 +1173,8 @@ class BinanceTrader(BaseTrader):
             position_type: str,
             leverage: int
     ) -> tuple[float, float]:
-        """Return tuple(take-profit, stop-loss) with leverage factor.
+        """Return tuple(take-profit, stop-loss) with leverage factor,
+        not rounded, use `SymbolFilters.round_tp_sl_prices`.
 
         Parameters
         ----------
@@ -512,28 +1193,202 @@ class BinanceTrader(BaseTrader):
         -------
         tuple[float, float]
         """
-        # Calculate take profit 
-        tp_price = \
-            entry_price * (1 + (tp_percent / 100)/leverage) if position_type == 'LONG' \
-                else entry_price * (1 - (tp_percent / 100)/leverage)
+        # Price move up for LONG, down for SHORT
+        sign = 1.0 if position_type == 'LONG' else -1.0
         
-        # Calculate stop loss
-        sl_price = \
-            entry_price * (1 - (sl_percent / 100)/leverage) if position_type == 'LONG' \
-                else entry_price * (1 + (sl_percent / 100)/leverage)
-        return round(tp_price, 2), round(sl_price, 2)
+        # Calculate take profit and stop loss
+        tp_factor = 1.0 + sign * (tp_percent * 0.01 / leverage)
+        sl_factor = 1.0 - sign * (sl_percent * 0.01 / leverage)
+        return entry_price * tp_factor, entry_price * sl_factor
 
     ##########################################################################
     
     @staticmethod
-    def round_to_precision(value: float):
-        return math.floor(value * 1000) / 1000
+    def calculate_tp_sl_prices_batch(
+            entry_prices: np.ndarray,
+            tp_percents: np.ndarray,
+            sl_percents: np.ndarray,
+            is_long: np.ndarray,
+            leverages: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized `calculate_tp_sl_prices` for a basket of symbols,
+        scalars are broadcast against the arrays. Prices are not 
+        rounded, tick size differs between symbols.
+        
+        Parameters
+        ----------
+        entry_prices : np.ndarray
+            Price placed at main order of each symbol
+        tp_percents : np.ndarray
+            Percentage for take profit
+        sl_percents : np.ndarray
+            Percentage for stop loss
+        is_long : np.ndarray
+            True for LONG, False for SHORT
+        leverages : np.ndarray
+            Leverage to calculate
+        
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            Arrays of take-profit and stop-loss prices
+        """
+        entry_prices = np.asarray(entry_prices, dtype=np.float64)
+        sign = np.where(is_long, 1.0, -1.0)
+        scale = 0.01 / np.asarray(leverages, dtype=np.float64)
+        
+        tp_factor = 1.0 + sign * (np.asarray(tp_percents) * scale)
+        sl_factor = 1.0 - sign * (np.asarray(sl_percents) * scale)
+        return entry_prices * tp_factor, entry_prices * sl_factor
     
     ##########################################################################
     
-    @staticmethod
-    def round_down_to_precision(price):
-        return round(price, 2)
+    def refresh_exchange_info(self) -> None:
+        """Fetch tick and step size of every symbol with one
+        `futures_exchange_info` call.
+        
+        Called automatically when the cache is older than 
+        `symbol_filters_ttl` seconds, can also be run by a scheduler.
+        """
+        self.filters.update(self.client.futures_exchange_info())
+    
+    ##########################################################################
+    
+    def invalidate_exchange_info(self) -> None:
+        """Drop the cached tick and step size, in memory and on disk"""
+        self.filters.invalidate()
+    
+    ##########################################################################
+    
+    def symbol_filters(self, symbol: str) -> tuple[Decimal, Decimal]:
+        """Return tuple(tick size, step size) of `symbol` from the
+        cached exchange info, without any request while it is fresh.
+
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+
+        Returns
+        -------
+        tuple[Decimal, Decimal]
+            `PRICE_FILTER.tickSize` and `LOT_SIZE.stepSize`
+        
+        Raises
+        ------
+        ValueError
+            If `symbol` is not traded on futures
+        """
+        if not self.filters.is_fresh():
+            self.refresh_exchange_info()
+        return self.filters.get(symbol)
+    
+    ##########################################################################
+    
+    def round_price(
+            self, 
+            symbol: str, 
+            price: float, 
+            rounding: str = ROUND_FLOOR,
+    ) -> Decimal:
+        """Round `price` to the tick size of `symbol`, down by default"""
+        self.symbol_filters(symbol)
+        return self.filters.round_price(symbol, price, rounding)
+    
+    ##########################################################################
+    
+    def round_quantity(self, symbol: str, quantity: float) -> Decimal:
+        """Round `quantity` down to the step size of `symbol`"""
+        self.symbol_filters(symbol)
+        return self.filters.round_quantity(symbol, quantity)
+    
+    ##########################################################################
+    
+    def income_history(
+            self,
+            start_time_ms: int,
+            end_time_ms: int,
+            income_type: str = 'REALIZED_PNL',
+    ) -> list[dict]:
+        """Fetch every income entry between `start_time_ms` and
+        `end_time_ms`, following the pages of 1000 rows
+
+        Parameters
+        ----------
+        start_time_ms : int
+            Start time in milliseconds
+        end_time_ms : int
+            End time in milliseconds
+        income_type : str, optional
+            Income type, by default 'REALIZED_PNL'
+
+        Returns
+        -------
+        list[dict]
+            Income entries ordered by time
+        """
+        return [
+            entry 
+            for page in self.iter_income_pages(
+                start_time_ms, end_time_ms, income_type
+            )
+            for entry in page
+        ]
+    
+    ##########################################################################
+    
+    def iter_income_pages(
+            self,
+            start_time_ms: int,
+            end_time_ms: int,
+            income_type: str = 'REALIZED_PNL',
+    ) -> Iterator[list[dict]]:
+        """Yield income entries between `start_time_ms` and 
+        `end_time_ms` page by page, only one page is held at a time
+        
+        The next page starts at the time of the last entry, entries
+        already seen at that millisecond are skipped by `tranId`.
+
+        Parameters
+        ----------
+        start_time_ms : int
+            Start time in milliseconds
+        end_time_ms : int
+            End time in milliseconds
+        income_type : str, optional
+            Income type, by default 'REALIZED_PNL'
+
+        Yields
+        ------
+        list[dict]
+            New income entries of each page, ordered by time
+        """
+        seen_tran_ids = set()
+        page_start_ms = start_time_ms
+        
+        while True:
+            page = self.client.futures_income_history(
+                incomeType=income_type,
+                startTime=page_start_ms,
+                endTime=end_time_ms,
+                limit=self.INCOME_PAGE_LIMIT,
+            )
+            new_entries = [
+                entry for entry in page 
+                if entry['tranId'] not in seen_tran_ids
+            ]
+            if new_entries:
+                yield new_entries
+            
+            if (len(page) < self.INCOME_PAGE_LIMIT) or (not new_entries):
+                return
+            
+            # Entries at the last millisecond may continue on the next page
+            page_start_ms = page[-1]['time']
+            seen_tran_ids = {
+                entry['tranId'] for entry in page 
+                if entry['time'] == page_start_ms
+            }
     
     ##########################################################################
     
@@ -544,7 +1399,8 @@ class BinanceTrader(BaseTrader):
     ) -> float:
         """Calculate PNL, if both `end_time` and `start_time` are none,
         it will use current timestamp as a end_time and 00:00:00
-        of the same date as a `start_date`.
+        of the same date as a `start_date`, read from the user data 
+        stream if started.
 
         Parameters
         ----------
@@ -566,38 +1422,58 @@ class BinanceTrader(BaseTrader):
             # Calculate the start time for the current day 
             # in UTC (midnight)
             if (end_time is None) and (start_time is None):
-                end_time = datetime.now(timezone.utc)
-                start_time = end_time.replace(
-                    hour=0, 
-                    minute=0,
-                    second=0,
-                    microsecond=0
-                )
+                start_time_ms, end_time_ms = today_window_ms()
+                
+                # Summed from the user data stream, no REST call
+                if (self.stream is not None) and self.stream.ready.is_set():
+                    total_pnl = self.stream.realized_pnl(
+                        start_time_ms // 86_400_000
+                    )
+                    if total_pnl is not None:
+                        self.logger.info(
+                            f"Total Daily PnL: {total_pnl} USDT from stream"
+                        )
+                        return total_pnl
             
             # Convert datetime to milliseconds 
             # (Binance API uses timestamps in milliseconds)
-            start_time_ms = int(start_time.timestamp() * 1000)
-            end_time_ms = int(end_time.timestamp() * 1000)
-            
-            # Fetch daily income (realized PnL)
-            pnl_data = self.client.futures_income_history(
-                incomeType='REALIZED_PNL',
-                startTime=start_time_ms,
-                endTime=end_time_ms
-            )
+            else:
+                start_time_ms = int(start_time.timestamp() * 1000)
+                end_time_ms = int(end_time.timestamp() * 1000)
             
-            # Calculate total daily PnL
-            total_pnl = sum(float(entry['income']) for entry in pnl_data)
+            # Fetch daily income (realized PnL) and sum it
+            # page by page, in one pass
+            debug = self.logger.isEnabledFor(logging.DEBUG)
+            total_pnl = 0.0
+            n_entries = 0
+            lines = []
+            for page in self.iter_income_pages(
+                    start_time_ms=start_time_ms,
+                    end_time_ms=end_time_ms,
+            ):
+                incomes = np.fromiter(
+                    (entry['income'] for entry in page),
+                    dtype=np.float64,
+                    count=len(page),
+                )
+                total_pnl += float(incomes.sum())
+                n_entries += len(page)
+                
+                # Detailed PnL entries, only at debug level
+                if debug:
+                    lines.extend(
+                        f"Time: {format_ms_utc(entry['time'])}, "
+                        f"PnL: {income} USDT"
+                        for entry, income in zip(page, incomes)
+                    )
             
-            self.logger.info(f"Total Daily PnL: {total_pnl} USDT")
+            # Emit every entry as one record
+            if lines:
+                self.logger.debug("PnL entries:\n%s", "\n".join(lines))
             
-            # Optionally, print detailed PnL entries
-            for entry in pnl_data:
-                timestamp = datetime.fromtimestamp(
-                    entry['time'] / 1000, tz=timezone.utc
-                )
-                income = float(entry['income'])
-                self.logger.info(f"Time: {timestamp}, PnL: {income} USDT")
+            self.logger.info(
+                f"Total Daily PnL: {total_pnl} USDT from {n_entries} entries"
+            )
             
             return total_pnl
 
@@ -607,3 +1483,113 @@ class BinanceTrader(BaseTrader):
     ##########################################################################
 
 ##############################################################################
+
+#############
+# Functions #
+##############################################################################
+
+@functools.lru_cache(maxsize=4)
+def civil_from_days(days: int) -> tuple[int, int, int]:
+    """Return (year, month, day) of `days` since 1970-01-01, 
+    with the civil-from-days algorithm of Howard Hinnant.
+    
+    Cached, consecutive entries usually fall on the same day.
+
+    Parameters
+    ----------
+    days : int
+        Days since the Unix epoch
+
+    Returns
+    -------
+    tuple[int, int, int]
+        Year, month and day
+    """
+    # Shift the epoch to 0000-03-01, so leap day is the last of a year
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (
+        day_of_era 
+        - day_of_era // 1460 
+        + day_of_era // 36524 
+        - day_of_era // 146096
+    ) // 365
+    day_of_year = day_of_era - (
+        365 * year_of_era + year_of_era // 4 - year_of_era // 100
+    )
+    month_from_march = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_from_march + 2) // 5 + 1
+    month = month_from_march + 3 if month_from_march < 10 \
+        else month_from_march - 9
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+##############################################################################
+
+def format_ms_utc(ms: int) -> str:
+    """Format millisecond timestamp `ms` as ISO 8601 UTC string,
+    without creating a datetime
+
+    Parameters
+    ----------
+    ms : int
+        Milliseconds since the Unix epoch
+
+    Returns
+    -------
+    str
+        e.g. "2024-01-31T23:59:59.999Z"
+    """
+    days, ms_of_day = divmod(ms, 86_400_000)
+    year, month, day = civil_from_days(days)
+    seconds, millisecond = divmod(ms_of_day, 1000)
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return f"{year:04d}-{month:02d}-{day:02d}" \
+        f"T{hour:02d}:{minute:02d}:{second:02d}.{millisecond:03d}Z"
+
+##############################################################################
+
+def today_window_ms() -> tuple[int, int]:
+    """Return (UTC midnight, now) in milliseconds, the default
+    window of `calculate_pnl`
+    
+    Midnight is a whole number of days since the Unix epoch,
+    so no datetime is created
+    
+    Returns
+    -------
+    tuple[int, int]
+        Start and end time in milliseconds
+    """
+    now_ms = int(time.time() * 1000)
+    return now_ms - now_ms % 86_400_000, now_ms
+
+##############################################################################
+
+@functools.lru_cache(maxsize=4)
+def get_trader(
+        api_key: str = os.environ["BINANCE_API_KEY"],
+        secret_key: str = os.environ["BINANCE_SECRET_KEY"],
+) -> BinanceTrader:
+    """Return the shared `BinanceTrader` of the key pair.
+    
+    Reusing the instance keeps its keep-alive connections, so only the
+    first call pays the TLS handshake.
+
+    Parameters
+    ----------
+    api_key : str, optional
+        Binance API key, by default os.environ["BINANCE_API_KEY"]
+    secret_key : str, optional
+        Binance secret key, by default os.environ["BINANCE_SECRET_KEY"]
+
+    Returns
+    -------
+    BinanceTrader
+        Shared trader
+    """
+    return BinanceTrader(api_key, secret_key)
+
+##############################################################################
@@ -0,0 +1,109 @@
+##########
+# Import #
+##############################################################################
+
+from decimal import Decimal
+from typing import Any
+import asyncio
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+import orjson
+import requests
+
+###########
+# Classes #
+##############################################################################
+
+class OrjsonClient(Client):
+    
+    @staticmethod
+    def _handle_response(response: requests.Response):
+        """Same as `Client._handle_response`, but decode the body
+        with orjson instead of the standard json module.
+        """
+        if not (200 <= response.status_code < 300):
+            raise BinanceAPIException(
+                response, 
+                response.status_code, 
+                response.text,
+            )
+        
+        if not response.content:
+            return {}
+        
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            raise BinanceRequestException(
+                f"Invalid Response: {response.text}"
+            )
+    
+    ##########################################################################
+
+##############################################################################
+
+class AsyncProxy:
+    
+    def __init__(self, target: object) -> None:
+        """Run blocking methods of `target` in a worker thread, so they
+        do not stall the calling event loop.
+        
+        Parameters
+        ----------
+        target : object
+            Object with blocking methods, e.g. `Client`
+        """
+        self.target = target
+    
+    ##########################################################################
+    
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """Await `target.method(*args, **kwargs)` in a worker thread
+        
+        Parameters
+        ----------
+        method : str
+            Name of method
+        
+        Returns
+        -------
+        Any
+            Return of the method
+        """
+        return await asyncio.to_thread(
+            getattr(self.target, method), 
+            *args, 
+            **kwargs,
+        )
+    
+    ##########################################################################
+
+##############################################################################
+
+#############
+# Functions #
+##############################################################################
+
+def to_param(value: Any) -> str:
+    """Format request parameter `value` as Binance expects,
+    lowercase booleans and numbers without exponent or trailing zeros,
+    e.g. 1e-07 to "0.0000001" and Decimal("116951.0") to "116951"
+    
+    Parameters
+    ----------
+    value : Any
+        Parameter value
+    
+    Returns
+    -------
+    str
+        Formatted value
+    """
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (float, Decimal)):
+        return format(Decimal(str(value)).normalize(), 'f')
+    return str(value)
+
+##############################################################################
@@ -0,0 +1,295 @@
+##########
+# Import #
+##############################################################################
+
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+import logging
+import math
+import os
+import time
+
+import orjson
+
+###########
+# Classes #
+##############################################################################
+
+class SymbolFilters:
+    
+    # Tick and step size kept between runs
+    EXCHANGE_INFO_PATH = os.path.join(
+        os.path.expanduser("~"),
+        ".cache",
+        "space_time_pipeline",
+        "exchange_info.json",
+    )
+    
+    def __init__(
+            self,
+            ttl: float = 3600,
+            path: str = EXCHANGE_INFO_PATH,
+            logger: logging.Logger = None,
+    ) -> None:
+        """Tick and step size of every futures symbol, parsed from
+        one `exchangeInfo` response and shared by the traders.
+        
+        The filters are also written to `path`, so the next process
+        can skip `exchangeInfo` while the file is younger than `ttl`.
+        Fetching `exchangeInfo` is left to the trader, sync or async.
+        
+        Parameters
+        ----------
+        ttl : float, optional
+            Seconds before the filters are fetched again, by default 3600
+        path : str, optional
+            File of the filters, not kept if None,
+            by default ~/.cache/space_time_pipeline/exchange_info.json
+        logger : logging.Logger, optional
+            Logger, by default None
+        """
+        self.ttl = ttl
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        
+        self.__filters = {}
+        self.__loaded_time = -math.inf
+    
+    ##########################################################################
+    
+    def is_fresh(self) -> bool:
+        """Return True if the filters in memory, or in `path`,
+        are younger than `ttl`
+        """
+        if time.monotonic() - self.__loaded_time <= self.ttl:
+            return True
+        return self.load()
+    
+    ##########################################################################
+    
+    def update(self, exchange_info: dict) -> None:
+        """Replace the filters by those of `exchange_info`
+        
+        Parameters
+        ----------
+        exchange_info : dict
+            Response of `GET /fapi/v1/exchangeInfo`
+        """
+        filters = {}
+        for info in exchange_info['symbols']:
+            symbol_filters = {
+                item['filterType']: item for item in info['filters']
+            }
+            filters[info['symbol']] = (
+                Decimal(symbol_filters['PRICE_FILTER']['tickSize']),
+                Decimal(symbol_filters['LOT_SIZE']['stepSize']),
+            )
+        self.__filters = filters
+        self.__loaded_time = time.monotonic()
+        self.save()
+    
+    ##########################################################################
+    
+    def save(self) -> None:
+        """Write the filters to `path`"""
+        if not self.path:
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            
+            # Replace at once, a reader never see a partial file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(
+                    orjson.dumps({
+                        symbol: [str(tick_size), str(step_size)]
+                        for symbol, (tick_size, step_size)
+                        in self.__filters.items()
+                    })
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Error saving exchange info: {e}")
+    
+    ##########################################################################
+    
+    def load(self) -> bool:
+        """Read the filters from `path` if it is younger than `ttl`
+        
+        Returns
+        -------
+        bool
+            True if loaded
+        """
+        if not self.path:
+            return False
+        
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+            if age > self.ttl:
+                return False
+            
+            with open(self.path, "rb") as file:
+                filters = orjson.loads(file.read())
+            self.__filters = {
+                symbol: (Decimal(tick_size), Decimal(step_size))
+                for symbol, (tick_size, step_size) in filters.items()
+            }
+            
+            # The TTL counts from when the file was written
+            self.__loaded_time = time.monotonic() - age
+            return True
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Error loading exchange info: {e}")
+            return False
+    
+    ##########################################################################
+    
+    def invalidate(self) -> None:
+        """Drop the filters, in memory and in `path`"""
+        self.__loaded_time = -math.inf
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+    
+    ##########################################################################
+    
+    def get(self, symbol: str) -> tuple[Decimal, Decimal]:
+        """Return tuple(tick size, step size) of `symbol`
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        
+        Returns
+        -------
+        tuple[Decimal, Decimal]
+            `PRICE_FILTER.tickSize` and `LOT_SIZE.stepSize`
+        
+        Raises
+        ------
+        ValueError
+            If `symbol` is not traded on futures
+        """
+        if symbol not in self.__filters:
+            raise ValueError(f"{symbol} does not suitable")
+        return self.__filters[symbol]
+    
+    ##########################################################################
+    
+    def round_price(
+            self,
+            symbol: str,
+            price: float,
+            rounding: str = ROUND_FLOOR,
+    ) -> Decimal:
+        """Round `price` to the tick size of `symbol`, down by default"""
+        tick_size, _ = self.get(symbol)
+        return self.round_to_increment(price, tick_size, rounding)
+    
+    ##########################################################################
+    
+    def round_quantity(self, symbol: str, quantity: float) -> Decimal:
+        """Round `quantity` down to the step size of `symbol`"""
+        _, step_size = self.get(symbol)
+        return self.round_to_increment(quantity, step_size)
+    
+    ##########################################################################
+    
+    def round_tp_sl_prices(
+            self,
+            symbol: str,
+            entry_price: Decimal,
+            take_profit_price: float,
+            stop_loss_price: float,
+            position_type: str,
+    ) -> tuple[Decimal, Decimal]:
+        """Round take profit and stop loss to the tick size of `symbol`,
+        toward `entry_price` but at least one tick away from it.
+        
+        So a take profit is never on or through the entry, and
+        neither exit is further than asked.
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        entry_price : Decimal
+            Price of the entry order, already rounded
+        take_profit_price : float
+            Take profit, from `calculate_tp_sl_prices`
+        stop_loss_price : float
+            Stop loss, from `calculate_tp_sl_prices`
+        position_type : str
+            Type of position, `LONG` or `SHORT`
+        
+        Returns
+        -------
+        tuple[Decimal, Decimal]
+            Rounded take profit and stop loss
+        """
+        tick_size, _ = self.get(symbol)
+        if position_type == 'LONG':
+            take_profit = max(
+                self.round_to_increment(
+                    take_profit_price, tick_size, ROUND_FLOOR
+                ),
+                entry_price + tick_size,
+            )
+            stop_loss = min(
+                self.round_to_increment(
+                    stop_loss_price, tick_size, ROUND_CEILING
+                ),
+                entry_price - tick_size,
+            )
+        else:
+            take_profit = min(
+                self.round_to_increment(
+                    take_profit_price, tick_size, ROUND_CEILING
+                ),
+                entry_price - tick_size,
+            )
+            stop_loss = max(
+                self.round_to_increment(
+                    stop_loss_price, tick_size, ROUND_FLOOR
+                ),
+                entry_price + tick_size,
+            )
+        return take_profit, stop_loss
+    
+    ##########################################################################
+    
+    @staticmethod
+    def round_to_increment(
+            value: float,
+            increment: Decimal,
+            rounding: str = ROUND_FLOOR,
+    ) -> Decimal:
+        """Round `value` to a multiple of `increment`
+        
+        Parameters
+        ----------
+        value : float
+            Value to round
+        increment : Decimal
+            Tick size or step size
+        rounding : str, optional
+            Rounding mode of `decimal`, by default ROUND_FLOOR
+        
+        Returns
+        -------
+        Decimal
+            Rounded value, with the decimals of `increment`
+        """
+        # Decimal prevent float error, like 0.3 // 0.1 == 2
+        steps = (Decimal(str(value)) / increment).to_integral_value(rounding)
+        return (steps * increment).quantize(increment)
+    
+    ##########################################################################
+
+##############################################################################
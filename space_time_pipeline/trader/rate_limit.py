@@ -0,0 +1,215 @@
+##########
+# Import #
+##############################################################################
+
+from collections import deque
+from urllib.parse import urlparse
+import logging
+import threading
+import time
+
+import requests
+
+###########
+# Classes #
+##############################################################################
+
+class SlidingWindowLimiter:
+    
+    def __init__(
+            self,
+            limits: tuple[tuple[int, float], ...],
+            logger: logging.Logger = None,
+    ) -> None:
+        """Block callers so that at most `count` events happen 
+        in any `seconds` long window, for every pair of `limits`
+        
+        Parameters
+        ----------
+        limits : tuple[tuple[int, float], ...]
+            Pairs of (count, seconds)
+        logger : logging.Logger, optional
+            Logger, by default None
+        """
+        self.limits = limits
+        self.logger = logger or logging.getLogger(__name__)
+        
+        # Event timestamps, enough to check the longest window
+        self.__events = deque(maxlen=max(count for count, _ in limits))
+        self.__lock = threading.Lock()
+    
+    ##########################################################################
+    
+    def acquire(self, count: int = 1) -> None:
+        """Block until `count` events fit in every window
+        
+        Parameters
+        ----------
+        count : int, optional
+            Number of events, by default 1
+        """
+        with self.__lock:
+            for _ in range(count):
+                while True:
+                    now = time.monotonic()
+                    wait = 0.0
+                    for limit, seconds in self.limits:
+                        if len(self.__events) >= limit:
+                            
+                            # Oldest event still inside the window
+                            oldest = self.__events[-limit]
+                            wait = max(wait, oldest + seconds - now)
+                    
+                    if wait <= 0:
+                        self.__events.append(now)
+                        break
+                    
+                    self.logger.warning(
+                        f"Order rate is near the limit, wait {wait:.2f} seconds"
+                    )
+                    time.sleep(wait)
+    
+    ##########################################################################
+
+##############################################################################
+
+class WeightedSession(requests.Session):
+    
+    # Request weight of futures endpoints, unlisted endpoint cost 1
+    ENDPOINT_WEIGHT = {
+        "/fapi/v1/order": 1,
+        "/fapi/v1/batchOrders": 5,
+        "/fapi/v1/allOpenOrders": 1,
+        "/fapi/v1/openOrders": 1,
+        "/fapi/v1/leverage": 1,
+        "/fapi/v1/ticker/price": 1,
+        "/fapi/v1/premiumIndex": 1,
+        "/fapi/v1/klines": 5,
+        "/fapi/v1/exchangeInfo": 1,
+        "/fapi/v1/income": 30,
+        "/fapi/v2/account": 5,
+        "/fapi/v3/account": 5,
+        "/fapi/v2/balance": 5,
+        "/fapi/v3/balance": 5,
+        "/fapi/v2/positionRisk": 5,
+        "/fapi/v3/positionRisk": 5,
+    }
+    
+    # Orders counted by each order endpoint, a batch hold up to 5
+    ORDER_ENDPOINT_COUNT = {
+        "/fapi/v1/order": 1,
+        "/fapi/v1/batchOrders": 5,
+    }
+    
+    def __init__(
+            self,
+            weight_limit: int = 2400,
+            safety_ratio: float = 0.9,
+            order_limits: tuple[tuple[int, float], ...] = (
+                (300, 10), 
+                (1200, 60),
+            ),
+            logger: logging.Logger = None,
+    ) -> None:
+        """Requests session that keeps the used request weight under
+        the per-minute limit of Binance.
+        
+        The used weight is synchronized with the `X-MBX-USED-WEIGHT-1M`
+        header of every response. Before each request, the session
+        sleeps until the next minute if the request would exceed
+        `safety_ratio * weight_limit`. New orders are also kept under
+        each (count, seconds) pair of `order_limits`.
+        
+        Parameters
+        ----------
+        weight_limit : int, optional
+            Request weight allowed per minute, by default 2400
+        safety_ratio : float, optional
+            Ratio of `weight_limit` to actually use, by default 0.9
+        order_limits : tuple[tuple[int, float], ...], optional
+            Maximum new orders per window, 
+            by default 300 per 10 seconds and 1200 per minute
+        logger : logging.Logger, optional
+            Logger, by default None
+        """
+        super().__init__()
+        self.weight_limit = weight_limit
+        self.safety_ratio = safety_ratio
+        self.logger = logger or logging.getLogger(__name__)
+        
+        self.used_weight = 0
+        self.__window = self.current_window()
+        self.__lock = threading.Lock()
+        self.order_limiter = SlidingWindowLimiter(
+            order_limits, 
+            logger=self.logger,
+        )
+    
+    ##########################################################################
+    
+    @staticmethod
+    def current_window() -> int:
+        """Binance counts weight in fixed windows of a clock minute"""
+        return int(time.time() // 60)
+    
+    ##########################################################################
+    
+    def acquire(self, weight: int) -> None:
+        """Block until `weight` can be spent in the current window
+        
+        Parameters
+        ----------
+        weight : int
+            Weight of the coming request
+        """
+        with self.__lock:
+            while True:
+                window = self.current_window()
+                if window != self.__window:
+                    self.__window = window
+                    self.used_weight = 0
+                
+                if self.used_weight + weight <= \
+                        self.safety_ratio * self.weight_limit:
+                    self.used_weight += weight
+                    return
+                
+                reset_in = 60 - time.time() % 60
+                self.logger.warning(
+                    f"Used weight {self.used_weight} is near the limit, "
+                    f"wait {reset_in:.2f} seconds"
+                )
+                time.sleep(reset_in)
+    
+    ##########################################################################
+    
+    def update(self, response: requests.Response) -> None:
+        """Synchronize the used weight with the server
+        
+        Parameters
+        ----------
+        response : requests.Response
+            Respond from Binance
+        """
+        used_weight = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used_weight is None:
+            return
+        
+        with self.__lock:
+            self.__window = self.current_window()
+            self.used_weight = int(used_weight)
+    
+    ##########################################################################
+    
+    def request(self, method: str, url: str, *args, **kwargs):
+        path = urlparse(url).path
+        if method.upper() == "POST" and path in self.ORDER_ENDPOINT_COUNT:
+            self.order_limiter.acquire(self.ORDER_ENDPOINT_COUNT[path])
+        self.acquire(self.ENDPOINT_WEIGHT.get(path, 1))
+        response = super().request(method, url, *args, **kwargs)
+        self.update(response)
+        return response
+    
+    ##########################################################################
+
+##############################################################################
@@ -0,0 +1,79 @@
+##########
+# Import #
+##############################################################################
+
+from typing import Callable
+import functools
+import random
+import time
+
+from binance.exceptions import BinanceAPIException
+
+#############
+# Constants #
+##############################################################################
+
+# Rejected by rate limit, the request was never executed
+RATE_LIMIT_ERROR_CODES = frozenset({-1003})
+
+# Also includes disconnect and timeout of the backend
+TRANSIENT_ERROR_CODES = frozenset({-1003, -1001, -1007})
+
+# HTTP status of an IP ban, also sent with -1003, retrying extends the ban
+IP_BANNED_STATUS = 418
+
+#############
+# Functions #
+##############################################################################
+
+def binance_retry(
+        max_attempts: int = 3,
+        base: float = 0.25,
+        cap: float = 4.0,
+        codes: frozenset[int] = TRANSIENT_ERROR_CODES,
+) -> Callable:
+    """Retry the decorated function on transient `BinanceAPIException`
+    with exponential backoff and jitter. Matched by error code only,
+    an IP ban (HTTP 418) is never retried.
+
+    Parameters
+    ----------
+    max_attempts : int, optional
+        Maximum number of calls, by default 3
+    base : float, optional
+        Wait of the first retry in seconds, doubled at each attempt, 
+        by default 0.25
+    cap : float, optional
+        Maximum wait in seconds, by default 4.0
+    codes : frozenset[int], optional
+        Error codes to retry, by default TRANSIENT_ERROR_CODES.
+        Use RATE_LIMIT_ERROR_CODES for non-idempotent calls, like
+        placing order, where a timeout does not tell whether it was
+        executed.
+
+    Returns
+    -------
+    Callable
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except BinanceAPIException as e:
+                    is_transient = (e.code in codes) \
+                        and (e.status_code != IP_BANNED_STATUS)
+                    if (not is_transient) or (attempt == max_attempts - 1):
+                        raise
+                    time.sleep(
+                        min(cap, base * 2 ** attempt) + random.random() * 0.1
+                    )
+        
+        return wrapper
+    
+    return decorator
+
+##############################################################################
@@ -0,0 +1,438 @@
+##########
+# Import #
+##############################################################################
+
+from typing import Callable, Iterable
+import logging
+import threading
+import time
+
+from binance import ThreadedWebsocketManager
+from binance.client import Client
+
+###########
+# Classes #
+##############################################################################
+
+class UserDataStream:
+    
+    # Order status that keep the order open
+    OPEN_ORDER_STATUS = frozenset({"NEW", "PARTIALLY_FILLED"})
+    
+    def __init__(
+            self,
+            client: Client,
+            logger: logging.Logger = None,
+            reconcile_interval: float = 60,
+            income_pages: Callable[[int, int], Iterable[list[dict]]] = None,
+    ) -> None:
+        """Local copy of positions, open orders and mark prices, kept
+        up to date by the futures user data and mark price streams.
+        
+        The state is loaded from REST at start, then updated by
+        `ACCOUNT_UPDATE`, `ACCOUNT_CONFIG_UPDATE`, `ORDER_TRADE_UPDATE`
+        and `markPriceUpdate` events. REST is read again every 
+        `reconcile_interval` seconds, in case an event was missed.
+        
+        Positions are kept by symbol and position side, so the LONG
+        and SHORT legs of hedge mode are followed separately.
+        
+        Realized PnL of the current UTC day is summed from the fills
+        of `ORDER_TRADE_UPDATE`, counted once per symbol and trade id, 
+        and merged with the income read by `income_pages` at each 
+        reconciliation.
+        
+        Parameters
+        ----------
+        client : Client
+            Authenticated client, used for the REST snapshot
+        logger : logging.Logger, optional
+            Logger, by default None
+        reconcile_interval : float, optional
+            Seconds between REST snapshots, by default 60
+        income_pages : Callable[[int, int], Iterable[list[dict]]], optional
+            Yield pages of realized PnL income between start and end 
+            time in milliseconds, e.g. `BinanceTrader.iter_income_pages`.
+            Realized PnL is not followed if None, by default None
+        """
+        self.client = client
+        self.logger = logger or logging.getLogger(__name__)
+        self.reconcile_interval = reconcile_interval
+        self.income_pages = income_pages
+        
+        # Set after the first snapshot is loaded
+        self.ready = threading.Event()
+        
+        # Position by symbol and position side, `BOTH` in one-way mode
+        self.__positions = {}
+        self.__leverages = {}
+        self.__open_orders = {}
+        self.__mark_prices = {}
+        
+        # Realized PnL of one UTC day, by (symbol, trade id)
+        # Trade id is only unique within a symbol
+        self.__pnl_day = None
+        self.__pnl_trades = {}
+        self.__realized_pnl = 0.0
+        self.__pnl_synced = False
+        
+        # Events received while a REST snapshot is fetched,
+        # replayed on top of it, None outside of `reconcile`
+        self.__buffered_events = None
+        self.__reconcile_lock = threading.Lock()
+        
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+        self.__stopped = threading.Event()
+        self.__twm = None
+        self.__reconcile_thread = None
+    
+    ##########################################################################
+    
+    def start(self, symbols: list[str] = None) -> None:
+        """Subscribe to the user data stream and the mark price
+        stream of each of `symbols`, then load the REST snapshot
+        
+        Parameters
+        ----------
+        symbols : list[str], optional
+            Symbols to follow the mark price, by default None
+        """
+        self.__stopped.clear()
+        self.__twm = ThreadedWebsocketManager(
+            api_key=self.client.API_KEY,
+            api_secret=self.client.API_SECRET,
+        )
+        
+        # Close the sockets already opened if the snapshot fails
+        try:
+            self.__twm.start()
+            self.__twm.start_futures_user_socket(callback=self.on_user_event)
+            for symbol in symbols or []:
+                self.__twm.start_symbol_mark_price_socket(
+                    callback=self.on_mark_price,
+                    symbol=symbol,
+                    fast=True,
+                )
+            
+            # Subscribe first, so no event after the snapshot is missed
+            self.reconcile()
+        except Exception:
+            self.stop()
+            raise
+        self.ready.set()
+        
+        self.__reconcile_thread = threading.Thread(
+            target=self.__reconcile_loop,
+            daemon=True,
+        )
+        self.__reconcile_thread.start()
+    
+    ##########################################################################
+    
+    def stop(self) -> None:
+        """Close every stream and stop the reconciliation"""
+        self.__stopped.set()
+        self.ready.clear()
+        if self.__twm is not None:
+            self.__twm.stop()
+            self.__twm = None
+    
+    ##########################################################################
+    
+    def reconcile(self) -> None:
+        """Replace the local state by the REST snapshot.
+        
+        Events received while the snapshot is fetched are replayed on
+        top of it, so a fill is never reverted by an older snapshot.
+        """
+        with self.__reconcile_lock:
+            with self.__lock:
+                self.__buffered_events = []
+            
+            try:
+                positions = {}
+                leverages = dict(self.__leverages)
+                for position in self.client.futures_position_information():
+                    positions.setdefault(position['symbol'], {})[
+                        position.get('positionSide', 'BOTH')
+                    ] = position
+                    if 'leverage' in position:
+                        leverages[position['symbol']] = position['leverage']
+                open_orders = {}
+                for order in self.client.futures_get_open_orders():
+                    open_orders.setdefault(
+                        order['symbol'], {}
+                    )[order['orderId']] = order
+            except Exception:
+                with self.__lock:
+                    self.__buffered_events = None
+                raise
+            
+            with self.__lock:
+                buffered_events, self.__buffered_events = \
+                    self.__buffered_events, None
+                self.__positions = positions
+                self.__leverages = leverages
+                self.__open_orders = open_orders
+                for message in buffered_events:
+                    self.__apply_user_event(message)
+                self.__changed.notify_all()
+        
+        if self.income_pages is not None:
+            self.reconcile_realized_pnl()
+    
+    ##########################################################################
+    
+    def reconcile_realized_pnl(self) -> None:
+        """Merge realized PnL income of the current UTC day from REST,
+        trades already counted by the stream are skipped
+        """
+        now_ms = int(time.time() * 1000)
+        day, ms_of_day = divmod(now_ms, 86_400_000)
+        
+        # Realized PnL always comes from a trade, 
+        # a row without trade id can not be matched to the stream
+        incomes = [
+            (
+                (entry['symbol'], str(entry['tradeId'])), 
+                float(entry['income']),
+            )
+            for page in self.income_pages(now_ms - ms_of_day, now_ms)
+            for entry in page
+            if entry.get('tradeId')
+        ]
+        
+        with self.__lock:
+            self.__start_pnl_day(day)
+            for trade_key, pnl in incomes:
+                self.__add_realized_pnl(day, trade_key, pnl)
+            self.__pnl_synced = True
+    
+    ##########################################################################
+    
+    def __reconcile_loop(self) -> None:
+        while not self.__stopped.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                self.logger.exception(f"Reconciliation failed: {e}")
+    
+    ##########################################################################
+    
+    def on_user_event(self, message: dict) -> None:
+        """Apply an event of the user data stream
+        
+        Parameters
+        ----------
+        message : dict
+            Event from the stream
+        """
+        if message.get('e') == 'error':
+            self.logger.error(f"User data stream error: {message}")
+            return
+        
+        with self.__lock:
+            if self.__buffered_events is not None:
+                self.__buffered_events.append(message)
+            self.__apply_user_event(message)
+            self.__changed.notify_all()
+    
+    ##########################################################################
+    
+    def __apply_user_event(self, message: dict) -> None:
+        # Called with the lock held
+        event_type = message.get('e')
+        
+        if event_type == 'ACCOUNT_UPDATE':
+            for position in message['a']['P']:
+                positions = self.__positions.setdefault(position['s'], {})
+                position_side = position.get('ps', 'BOTH')
+                positions[position_side] = {
+                    **positions.get(position_side, {}),
+                    'symbol': position['s'],
+                    'positionSide': position_side,
+                    'positionAmt': position['pa'],
+                    'entryPrice': position['ep'],
+                    'unRealizedProfit': position['up'],
+                }
+        
+        elif event_type == 'ORDER_TRADE_UPDATE':
+            order = message['o']
+            orders = self.__open_orders.setdefault(order['s'], {})
+            if order['X'] in self.OPEN_ORDER_STATUS:
+                orders[order['i']] = {
+                    'symbol': order['s'],
+                    'orderId': order['i'],
+                    'side': order['S'],
+                    'type': order['o'],
+                    'status': order['X'],
+                    'origQty': order['q'],
+                    'price': order['p'],
+                    'stopPrice': order['sp'],
+                }
+            else:
+                orders.pop(order['i'], None)
+            
+            # Each fill carries its realized profit
+            if order['x'] == 'TRADE':
+                self.__add_realized_pnl(
+                    order['T'] // 86_400_000,
+                    (order['s'], str(order['t'])),
+                    float(order['rp']),
+                )
+        
+        elif event_type == 'ACCOUNT_CONFIG_UPDATE':
+            config = message.get('ac')
+            if config is None:
+                return
+            
+            # Leverage is shared by every position side of the symbol
+            self.__leverages[config['s']] = str(config['l'])
+    
+    ##########################################################################
+    
+    def __start_pnl_day(self, day: int) -> None:
+        # Reset at the first record of a new UTC day
+        if (self.__pnl_day is None) or (day > self.__pnl_day):
+            self.__pnl_day = day
+            self.__pnl_trades = {}
+            self.__realized_pnl = 0.0
+    
+    ##########################################################################
+    
+    def __add_realized_pnl(
+            self, 
+            day: int, 
+            trade_key: tuple[str, str], 
+            pnl: float,
+    ) -> None:
+        # Called with the lock held
+        self.__start_pnl_day(day)
+        if (day < self.__pnl_day) or (trade_key in self.__pnl_trades):
+            return
+        self.__pnl_trades[trade_key] = pnl
+        self.__realized_pnl += pnl
+    
+    ##########################################################################
+    
+    def on_mark_price(self, message: dict) -> None:
+        """Apply an event of the mark price stream
+        
+        Parameters
+        ----------
+        message : dict
+            Event from the stream
+        """
+        message = message.get('data', message)
+        if message.get('e') == 'markPriceUpdate':
+            self.__mark_prices[message['s']] = float(message['p'])
+        elif message.get('e') == 'error':
+            self.logger.error(f"Mark price stream error: {message}")
+    
+    ##########################################################################
+    
+    def positions(self, symbol: str) -> list[dict]:
+        """Return position of each position side of `symbol`, 
+        one in one-way mode, LONG and SHORT in hedge mode
+        """
+        with self.__lock:
+            leverage = self.__leverages.get(symbol)
+            return [
+                {**position, 'leverage': leverage} 
+                if leverage is not None else dict(position)
+                for position in self.__positions.get(symbol, {}).values()
+            ]
+    
+    ##########################################################################
+    
+    def position(self, symbol: str) -> dict:
+        """Return position of `symbol`, the open side first in 
+        hedge mode, None if there is no record
+        """
+        positions = self.positions(symbol)
+        for position in positions:
+            if float(position['positionAmt']) != 0:
+                return position
+        if positions:
+            return positions[0]
+        
+        # Leverage is known before the first position
+        with self.__lock:
+            leverage = self.__leverages.get(symbol)
+        if leverage is None:
+            return None
+        return {'symbol': symbol, 'positionAmt': '0', 'leverage': leverage}
+    
+    ##########################################################################
+    
+    def open_orders(self, symbol: str) -> list[dict]:
+        """Return open orders of `symbol`"""
+        with self.__lock:
+            return list(self.__open_orders.get(symbol, {}).values())
+    
+    ##########################################################################
+    
+    def wait_until_flat(self, symbol: str, timeout: float) -> bool:
+        """Block until `symbol` has neither open order nor position
+        on any position side,
+        woken by each event instead of polling
+        
+        Parameters
+        ----------
+        symbol : str
+            Target symbol
+        timeout : float
+            Maximum seconds to wait
+        
+        Returns
+        -------
+        bool
+            True if flat, False if `timeout` is reached
+        """
+        # Every position side must be flat, in hedge mode
+        def is_flat() -> bool:
+            return (not self.__open_orders.get(symbol)) and all(
+                float(position['positionAmt']) == 0
+                for position in self.__positions.get(symbol, {}).values()
+            )
+        
+        with self.__changed:
+            return self.__changed.wait_for(is_flat, timeout=timeout)
+    
+    ##########################################################################
+    
+    def mark_price(self, symbol: str) -> float:
+        """Return last mark price of `symbol`, None before
+        the first update
+        """
+        return self.__mark_prices.get(symbol)
+    
+    ##########################################################################
+    
+    def realized_pnl(self, day: int) -> float:
+        """Return realized PnL of UTC `day`
+        
+        Parameters
+        ----------
+        day : int
+            Days since the Unix epoch
+        
+        Returns
+        -------
+        float
+            Realized PnL in usdt, None before the first reconciliation
+            of income or if `day` is already gone
+        """
+        with self.__lock:
+            if (not self.__pnl_synced) or (day < self.__pnl_day):
+                return None
+            
+            # No trade yet since midnight
+            if day > self.__pnl_day:
+                return 0.0
+            return self.__realized_pnl
+    
+    ##########################################################################
+
+##############################################################################
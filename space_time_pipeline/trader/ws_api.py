@@ -0,0 +1,257 @@
+##########
+# Import #
+##############################################################################
+
+import asyncio
+import hashlib
+import hmac
+import itertools
+import logging
+import os
+import time
+
+import aiohttp
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+import orjson
+
+from .client import to_param
+
+###########
+# Classes #
+##############################################################################
+
+class WebsocketApi:
+    
+    WS_URL = os.environ.get(
+        "WS_FAPI_BASE", "wss://ws-fapi.binance.com/ws-fapi/v1"
+    )
+    
+    def __init__(
+            self,
+            api_key: str,
+            secret_key: str,
+            session: aiohttp.ClientSession,
+            logger: logging.Logger = None,
+            url: str = WS_URL,
+            heartbeat: float = 30,
+            timeout: float = 10,
+            max_backoff: float = 30,
+    ) -> None:
+        """Signed requests over one persistent connection to the
+        futures WebSocket API, e.g. `order.place` and `order.cancel`.
+        
+        Each request carries an `id`, its response resolves the future
+        waiting for that `id`. The connection is reopened with
+        exponential backoff when it drops.
+        
+        Parameters
+        ----------
+        api_key : str
+            Binance API key
+        secret_key : str
+            Binance secret key
+        session : aiohttp.ClientSession
+            Session to open the connection
+        logger : logging.Logger, optional
+            Logger, by default None
+        url : str, optional
+            WebSocket API endpoint, by default os.environ["WS_FAPI_BASE"]
+            or "wss://ws-fapi.binance.com/ws-fapi/v1"
+        heartbeat : float, optional
+            Seconds between pings, by default 30
+        timeout : float, optional
+            Seconds to wait for each response, by default 10
+        max_backoff : float, optional
+            Maximum seconds between reconnections, by default 30
+        """
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.session = session
+        self.logger = logger or logging.getLogger(__name__)
+        self.url = url
+        self.heartbeat = heartbeat
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        
+        self.__ws = None
+        self.__reader = None
+        self.__closed = False
+        self.__pending = {}
+        self.__ids = itertools.count()
+    
+    ##########################################################################
+    
+    @property
+    def connected(self) -> bool:
+        return (self.__ws is not None) and (not self.__ws.closed)
+    
+    ##########################################################################
+    
+    async def connect(self) -> None:
+        """Open the connection and start reading responses"""
+        self.__closed = False
+        self.__ws = await self.session.ws_connect(
+            self.url,
+            heartbeat=self.heartbeat,
+        )
+        self.__reader = asyncio.create_task(self.__read())
+    
+    ##########################################################################
+    
+    async def close(self) -> None:
+        """Close the connection, pending requests fail"""
+        self.__closed = True
+        if self.__reader is not None:
+            self.__reader.cancel()
+            self.__reader = None
+        if self.connected:
+            await self.__ws.close()
+        self.__fail_pending()
+    
+    ##########################################################################
+    
+    async def __read(self) -> None:
+        backoff = 0.5
+        while not self.__closed:
+            try:
+                async for message in self.__ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        self.__resolve(orjson.loads(message.data))
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Websocket API read failed: {e}")
+            
+            # Responses of the old connection never come
+            self.__fail_pending()
+            
+            # Reconnect with exponential backoff
+            while not self.__closed:
+                self.logger.warning(
+                    f"Websocket API disconnected, reconnect in {backoff} seconds"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                try:
+                    self.__ws = await self.session.ws_connect(
+                        self.url,
+                        heartbeat=self.heartbeat,
+                    )
+                    backoff = 0.5
+                    break
+                except Exception as e:
+                    self.logger.warning(f"Websocket API reconnect failed: {e}")
+    
+    ##########################################################################
+    
+    def __resolve(self, response: dict) -> None:
+        future = self.__pending.pop(response.get('id'), None)
+        if (future is None) or future.done():
+            return
+        
+        if response.get('status') == 200:
+            future.set_result(response['result'])
+        else:
+            future.set_exception(
+                BinanceAPIException(
+                    None,
+                    response.get('status'),
+                    orjson.dumps(response.get('error', {})).decode(),
+                )
+            )
+    
+    ##########################################################################
+    
+    def __fail_pending(self) -> None:
+        pending, self.__pending = self.__pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(
+                    BinanceRequestException(
+                        "Websocket API disconnected before the response, "
+                        "the request may or may not be executed"
+                    )
+                )
+    
+    ##########################################################################
+    
+    def sign(self, params: dict) -> dict:
+        """Add `apiKey`, `timestamp` and the HMAC-SHA256 `signature`
+        of the alphabetically sorted `params`
+        
+        Parameters
+        ----------
+        params : dict
+            Request parameters
+        
+        Returns
+        -------
+        dict
+            Signed parameters
+        """
+        params["apiKey"] = self.api_key
+        params["timestamp"] = int(time.time() * 1000)
+        payload = "&".join(
+            f"{key}={value}" for key, value in sorted(params.items())
+        )
+        params["signature"] = hmac.new(
+            self.secret_key.encode(),
+            payload.encode(),
+            hashlib.sha256,
+        ).hexdigest()
+        return params
+    
+    ##########################################################################
+    
+    async def request(self, method: str, **params) -> dict:
+        """Send signed request `method` and wait for its response
+        
+        Parameters
+        ----------
+        method : str
+            WebSocket API method, e.g. "order.place"
+        
+        Returns
+        -------
+        dict
+            `result` of the response
+        
+        Raises
+        ------
+        ConnectionError
+            If not connected, nothing is sent
+        BinanceAPIException
+            If the server respond with error status
+        BinanceRequestException
+            If the connection drops before the response
+        """
+        if not self.connected:
+            raise ConnectionError("Websocket API is not connected")
+        
+        # Binance expects lowercase booleans and plain decimals
+        params = self.sign({
+            key: to_param(value)
+            for key, value in params.items()
+            if value is not None
+        })
+        request_id = str(next(self.__ids))
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[request_id] = future
+        
+        try:
+            await self.__ws.send_str(
+                orjson.dumps({
+                    "id": request_id,
+                    "method": method,
+                    "params": params,
+                }).decode()
+            )
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            self.__pending.pop(request_id, None)
+    
+    ##########################################################################
+
+##############################################################################
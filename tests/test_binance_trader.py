@@ -0,0 +1,170 @@
+##########
+# Import #
+##############################################################################
+
+import logging
+import os
+import unittest
+from unittest import mock
+
+# Default arguments of the traders read the keys at import
+os.environ.setdefault("BINANCE_API_KEY", "test")
+os.environ.setdefault("BINANCE_SECRET_KEY", "test")
+
+from binance.exceptions import BinanceAPIException, BinanceOrderException
+
+from space_time_pipeline.trader.binance import BinanceTrader
+
+#############
+# Functions #
+##############################################################################
+
+def api_exception(code: int, msg: str) -> BinanceAPIException:
+    return BinanceAPIException(
+        mock.Mock(), 400, f'{{"code": {code}, "msg": "{msg}"}}'
+    )
+
+###########
+# Classes #
+##############################################################################
+
+class TestBatchOrderRollback(unittest.TestCase):
+
+    def setUp(self):
+        # Client of the trader, without any request
+        self.client = mock.Mock()
+        self.client.session.headers = {}
+
+        # The trader wraps them by retry, keep the mocks
+        self.place_batch_order = self.client.futures_place_batch_order
+        self.create_order = self.client.futures_create_order
+        self.cancel_order = self.client.futures_cancel_order
+        self.get_order = self.client.futures_get_order
+        with mock.patch(
+            "space_time_pipeline.trader.binance.OrjsonClient",
+            return_value=self.client,
+        ):
+            self.trader = BinanceTrader(
+                api_key="test",
+                secret_key="test",
+                logger=logging.getLogger(__name__),
+                exchange_info_path=None,
+            )
+
+        self.orders = [
+            {
+                'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'LIMIT',
+                'quantity': 0.047, 'price': 60000, 'timeInForce': 'GTC',
+            },
+            {
+                'symbol': 'BTCUSDT', 'side': 'SELL',
+                'type': 'TAKE_PROFIT_MARKET', 'stopPrice': 61000,
+                'closePosition': True,
+            },
+            {
+                'symbol': 'BTCUSDT', 'side': 'SELL',
+                'type': 'STOP_MARKET', 'stopPrice': 59000,
+                'closePosition': True,
+            },
+        ]
+
+        # Entry and take profit are accepted, stop loss is rejected
+        self.place_batch_order.return_value = [
+            {'symbol': 'BTCUSDT', 'orderId': 1, 'side': 'BUY'},
+            {'symbol': 'BTCUSDT', 'orderId': 2, 'side': 'SELL'},
+            {'code': -2021, 'msg': 'Order would immediately trigger.'},
+        ]
+
+    ##########################################################################
+
+    def assert_canceled(self, *order_ids: int) -> None:
+        self.assertEqual(
+            [
+                call.kwargs['orderId']
+                for call in self.cancel_order.call_args_list
+            ],
+            list(order_ids),
+        )
+
+    ##########################################################################
+
+    def test_close_filled_entry_when_cancel_fails(self):
+        def cancel_order(symbol: str, orderId: int) -> dict:
+            if orderId == 1:
+                raise api_exception(-2011, 'Unknown order sent.')
+            return {'orderId': orderId, 'side': 'SELL', 'executedQty': '0'}
+        self.cancel_order.side_effect = cancel_order
+        self.get_order.return_value = {
+            'orderId': 1, 'side': 'BUY', 'executedQty': '0.047',
+        }
+
+        with self.assertRaises(BinanceOrderException) as context:
+            self.trader.futures_batch_orders(self.orders)
+
+        self.assertEqual(context.exception.code, -2021)
+        self.assert_canceled(1, 2)
+        self.get_order.assert_called_once_with(
+            symbol='BTCUSDT', orderId=1,
+        )
+        self.create_order.assert_called_once_with(
+            symbol='BTCUSDT',
+            side='SELL',
+            type='MARKET',
+            quantity='0.047',
+            reduceOnly=True,
+        )
+
+    ##########################################################################
+
+    def test_close_partially_filled_entry(self):
+        self.cancel_order.side_effect = [
+            {'orderId': 1, 'side': 'BUY', 'executedQty': '0.02'},
+            {'orderId': 2, 'side': 'SELL', 'executedQty': '0'},
+        ]
+
+        with self.assertRaises(BinanceOrderException):
+            self.trader.futures_batch_orders(self.orders)
+
+        self.assert_canceled(1, 2)
+        self.create_order.assert_called_once_with(
+            symbol='BTCUSDT',
+            side='SELL',
+            type='MARKET',
+            quantity='0.02',
+            reduceOnly=True,
+        )
+
+    ##########################################################################
+
+    def test_unfilled_entry_is_only_canceled(self):
+        self.cancel_order.side_effect = [
+            {'orderId': 1, 'side': 'BUY', 'executedQty': '0'},
+            {'orderId': 2, 'side': 'SELL', 'executedQty': '0'},
+        ]
+
+        with self.assertRaises(BinanceOrderException):
+            self.trader.futures_batch_orders(self.orders)
+
+        self.assert_canceled(1, 2)
+        self.create_order.assert_not_called()
+
+    ##########################################################################
+
+    def test_log_error_when_close_fails(self):
+        self.cancel_order.side_effect = [
+            {'orderId': 1, 'side': 'BUY', 'executedQty': '0.047'},
+            {'orderId': 2, 'side': 'SELL', 'executedQty': '0'},
+        ]
+        self.create_order.side_effect = \
+            api_exception(-2022, 'ReduceOnly Order is rejected.')
+
+        with self.assertLogs(__name__, level='ERROR') as logs:
+            with self.assertRaises(BinanceOrderException):
+                self.trader.futures_batch_orders(self.orders)
+
+        self.assertIn('without take profit and stop loss', logs.output[0])
+
+##############################################################################
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+##########
+# Import #
+##############################################################################
+
+import os
+import unittest
+from unittest import mock
+
+# Default arguments of the traders read the keys at import
+os.environ.setdefault("BINANCE_API_KEY", "test")
+os.environ.setdefault("BINANCE_SECRET_KEY", "test")
+
+from space_time_pipeline.trader.stream import UserDataStream
+
+############
+# Variable #
+##############################################################################
+
+DAY_MS = 86_400_000
+
+#############
+# Functions #
+##############################################################################
+
+def account_update(symbol: str, amount: str, side: str = 'BOTH') -> dict:
+    return {
+        'e': 'ACCOUNT_UPDATE',
+        'a': {'P': [
+            {'s': symbol, 'ps': side, 'pa': amount, 'ep': '0', 'up': '0'},
+        ]},
+    }
+
+##############################################################################
+
+def order_update(
+        symbol: str,
+        order_id: int,
+        status: str,
+        trade_id: int = 0,
+        realized_pnl: str = '0',
+        trade_time: int = 0,
+) -> dict:
+    return {
+        'e': 'ORDER_TRADE_UPDATE',
+        'o': {
+            's': symbol, 'i': order_id, 'S': 'SELL', 'o': 'LIMIT',
+            'X': status, 'q': '0.01', 'p': '100', 'sp': '0',
+            'x': 'TRADE' if trade_id else 'NEW',
+            't': trade_id, 'rp': realized_pnl, 'T': trade_time,
+        },
+    }
+
+###########
+# Classes #
+##############################################################################
+
+class TestReconcile(unittest.TestCase):
+
+    def test_replay_events_received_during_snapshot(self):
+        client = mock.Mock()
+        stream = UserDataStream(client)
+
+        # The fill arrives while the older snapshot is fetched
+        def position_information():
+            stream.on_user_event(account_update('BTCUSDT', '0'))
+            stream.on_user_event(order_update('BTCUSDT', 1, 'FILLED'))
+            return [{
+                'symbol': 'BTCUSDT',
+                'positionSide': 'BOTH',
+                'positionAmt': '0.01',
+                'entryPrice': '100',
+            }]
+        client.futures_position_information.side_effect = \
+            position_information
+        client.futures_get_open_orders.return_value = [
+            {'symbol': 'BTCUSDT', 'orderId': 1, 'type': 'LIMIT'},
+        ]
+
+        stream.reconcile()
+
+        self.assertEqual(stream.position('BTCUSDT')['positionAmt'], '0')
+        self.assertEqual(stream.open_orders('BTCUSDT'), [])
+        self.assertTrue(stream.wait_until_flat('BTCUSDT', timeout=0))
+
+    ##########################################################################
+
+    def test_failed_snapshot_stop_buffering(self):
+        client = mock.Mock()
+        client.futures_position_information.side_effect = RuntimeError
+        stream = UserDataStream(client)
+
+        with self.assertRaises(RuntimeError):
+            stream.reconcile()
+
+        stream.on_user_event(account_update('BTCUSDT', '0.01'))
+        self.assertEqual(stream.position('BTCUSDT')['positionAmt'], '0.01')
+
+    ##########################################################################
+
+    def test_start_close_sockets_if_snapshot_fails(self):
+        client = mock.Mock()
+        client.futures_position_information.side_effect = RuntimeError
+        stream = UserDataStream(client)
+
+        with mock.patch(
+            "space_time_pipeline.trader.stream.ThreadedWebsocketManager"
+        ) as twm:
+            with self.assertRaises(RuntimeError):
+                stream.start(['BTCUSDT'])
+
+        twm.return_value.stop.assert_called_once()
+        self.assertFalse(stream.ready.is_set())
+
+##############################################################################
+
+class TestHedgeMode(unittest.TestCase):
+
+    def test_flat_only_when_every_side_is_flat(self):
+        client = mock.Mock()
+        client.futures_position_information.return_value = [
+            {
+                'symbol': 'BTCUSDT', 'positionSide': side,
+                'positionAmt': '0', 'entryPrice': '0',
+            }
+            for side in ('LONG', 'SHORT')
+        ]
+        client.futures_get_open_orders.return_value = []
+        stream = UserDataStream(client)
+        stream.reconcile()
+
+        stream.on_user_event(account_update('BTCUSDT', '-0.01', 'SHORT'))
+        stream.on_user_event(account_update('BTCUSDT', '0', 'LONG'))
+
+        self.assertEqual(stream.position('BTCUSDT')['positionSide'], 'SHORT')
+        self.assertEqual(len(stream.positions('BTCUSDT')), 2)
+        self.assertFalse(stream.wait_until_flat('BTCUSDT', timeout=0))
+
+        stream.on_user_event(account_update('BTCUSDT', '0', 'SHORT'))
+        self.assertTrue(stream.wait_until_flat('BTCUSDT', timeout=0))
+
+##############################################################################
+
+class TestRealizedPnl(unittest.TestCase):
+
+    def setUp(self):
+        self.day = 20_000
+        self.incomes = []
+
+        client = mock.Mock()
+        client.futures_position_information.return_value = []
+        client.futures_get_open_orders.return_value = []
+        self.stream = UserDataStream(
+            client,
+            income_pages=lambda start_time, end_time: [self.incomes],
+        )
+
+    ##########################################################################
+
+    def reconcile(self, day: int) -> None:
+        with mock.patch(
+            "space_time_pipeline.trader.stream.time.time",
+            return_value=(day * DAY_MS + 1_000) / 1000,
+        ):
+            self.stream.reconcile()
+
+    ##########################################################################
+
+    def fill(self, symbol: str, trade_id: int, pnl: str, day: int) -> None:
+        self.stream.on_user_event(
+            order_update(
+                symbol, trade_id, 'FILLED',
+                trade_id=trade_id,
+                realized_pnl=pnl,
+                trade_time=day * DAY_MS + 5_000,
+            )
+        )
+
+    ##########################################################################
+
+    def test_none_before_income_is_reconciled(self):
+        self.fill('BTCUSDT', 1, '1.5', self.day)
+        self.assertIsNone(self.stream.realized_pnl(self.day))
+
+    ##########################################################################
+
+    def test_trade_counted_once_by_symbol_and_trade_id(self):
+        self.incomes = [
+            {'symbol': 'BTCUSDT', 'tradeId': '7', 'income': '1.5'},
+            {'symbol': 'ETHUSDT', 'tradeId': '7', 'income': '2.0'},
+            {'symbol': 'BTCUSDT', 'tradeId': '', 'income': '100'},
+        ]
+        self.fill('BTCUSDT', 7, '1.5', self.day)
+        self.reconcile(self.day)
+
+        # Same trade id on another symbol is another trade
+        self.assertAlmostEqual(self.stream.realized_pnl(self.day), 3.5)
+
+        # Replayed by the stream and by REST again
+        self.fill('ETHUSDT', 7, '2.0', self.day)
+        self.reconcile(self.day)
+        self.assertAlmostEqual(self.stream.realized_pnl(self.day), 3.5)
+
+    ##########################################################################
+
+    def test_reset_at_new_day(self):
+        self.incomes = [
+            {'symbol': 'BTCUSDT', 'tradeId': '1', 'income': '1.5'},
+        ]
+        self.reconcile(self.day)
+        self.assertAlmostEqual(self.stream.realized_pnl(self.day), 1.5)
+
+        # No trade yet since midnight
+        self.assertEqual(self.stream.realized_pnl(self.day + 1), 0.0)
+
+        self.fill('BTCUSDT', 2, '-0.5', self.day + 1)
+        self.assertAlmostEqual(self.stream.realized_pnl(self.day + 1), -0.5)
+        self.assertIsNone(self.stream.realized_pnl(self.day))
+
+        # A late fill of the previous day is not counted
+        self.fill('BTCUSDT', 3, '4.0', self.day)
+        self.assertAlmostEqual(self.stream.realized_pnl(self.day + 1), -0.5)
+
+##############################################################################
+
+if __name__ == "__main__":
+    unittest.main()